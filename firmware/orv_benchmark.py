@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+ORV Study Buddy - Headless Rendering Benchmark
+Runs every screen/timer/character combination under SDL's dummy drivers with a
+manual clock and reports frame-time percentiles, allocations and per-method
+timings as JSON. Pass --baseline to fail on frame-time regressions.
+
+    python3 orv_benchmark.py --frames 3000 --output bench.json
+    python3 orv_benchmark.py --baseline bench.json --tolerance 0.15
+    python3 orv_benchmark.py --display-output memory
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+
+# Must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import orv_study_buddy as orv
+from orv_study_buddy import ORVStudyBuddy, ManualClock, TimerState, KimDokjaState
+
+SCREENS = ["main", "notes", "stats"]
+FRAME_SECONDS = 1 / 30
+WARMUP_FRAMES = 30
+
+# Methods timed individually on every frame
+TIMED_METHODS = [
+    'check_timer',
+    'update_animation',
+    'render_frame',
+    'draw_main_screen',
+    'draw_notes_screen',
+    'draw_stats_screen',
+    'draw_kim_dokja',
+    'present'
+]
+
+# Regressions smaller than this are treated as noise
+MIN_REGRESSION_MS = 0.05
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_revision():
+    """Get the current git revision, if there is one"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class MethodTimer:
+    """Wraps app methods to accumulate the time spent in each"""
+
+    def __init__(self, app, names):
+        self.totals = {}
+        for name in names:
+            self.totals[name] = 0.0
+            setattr(app, name, self._wrap(name, getattr(app, name)))
+
+    def _wrap(self, name, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.totals[name] += time.perf_counter() - start
+        return timed
+
+    def reset(self):
+        for name in self.totals:
+            self.totals[name] = 0.0
+
+
+def set_state(app, clock, screen, timer_state, character_state):
+    """Put the app into one combination of screen, timer and character state"""
+    app.current_screen = screen
+    app.timer_state = timer_state
+    app.kim_dokja_state = character_state
+    app.scheduler.cancel(orv.POMODORO_TIMER)
+    if timer_state != TimerState.IDLE:
+        paused = timer_state == TimerState.PAUSED
+        app.schedule_pomodoro(app.work_seconds, elapsed=60 if paused else 0, paused=paused)
+    app._drawn_screen = None
+
+
+def run_frame(app, clock):
+    """Run one iteration of the frame loop body"""
+    clock.advance(FRAME_SECONDS)
+    app.check_timer()
+    app.update_animation()
+    app.present(app.render_frame())
+
+
+def benchmark_combination(app, clock, timer, frames):
+    """Measure one state combination"""
+    for _ in range(WARMUP_FRAMES):
+        run_frame(app, clock)
+
+    timer.reset()
+    frame_ms = []
+    net_blocks = 0
+    for _ in range(frames):
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        run_frame(app, clock)
+        frame_ms.append((time.perf_counter() - start) * 1000)
+        net_blocks += sys.getallocatedblocks() - blocks_before
+    method_ms = {name: total * 1000 / frames for name, total in timer.totals.items() if total}
+
+    # Transient allocation volume, measured separately since tracing skews timings
+    traced_frames = max(1, frames // 10)
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(traced_frames):
+        tracemalloc.reset_peak()
+        current_before, _ = tracemalloc.get_traced_memory()
+        run_frame(app, clock)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - current_before
+    tracemalloc.stop()
+
+    frame_ms.sort()
+    return {
+        'frames': frames,
+        'mean_ms': sum(frame_ms) / len(frame_ms),
+        'p50_ms': percentile(frame_ms, 0.50),
+        'p95_ms': percentile(frame_ms, 0.95),
+        'p99_ms': percentile(frame_ms, 0.99),
+        'max_ms': frame_ms[-1],
+        'net_blocks_per_frame': net_blocks / frames,
+        'peak_alloc_bytes_per_frame': allocated / traced_frames,
+        'methods_ms': method_ms
+    }
+
+
+def run_benchmark(frames, render_mode, display_output="sdl"):
+    """Benchmark every combination, returns the result document"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        clock = ManualClock()
+        app = ORVStudyBuddy(data_dir=data_dir, time_source=clock)
+        app.render_mode = render_mode
+        if display_output != "sdl":
+            app.set_output(display_output)
+        for i in range(20):
+            app.notes_store.append(f"Benchmark note {i} with some text to render")
+        timer = MethodTimer(app, TIMED_METHODS)
+
+        results = {}
+        for screen in SCREENS:
+            for timer_state in TimerState:
+                for character_state in KimDokjaState:
+                    name = f"{screen}/{timer_state.value}/{character_state.value}"
+                    set_state(app, clock, screen, timer_state, character_state)
+                    results[name] = benchmark_combination(app, clock, timer, frames)
+                    print(f"{name:40s} p50 {results[name]['p50_ms']:.3f} ms"
+                          f"  p95 {results[name]['p95_ms']:.3f} ms"
+                          f"  p99 {results[name]['p99_ms']:.3f} ms")
+
+        text_cache = app.text_cache.stats()
+        app.writer.close()
+        pygame.quit()
+
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'machine': platform.machine(),
+            'render_mode': render_mode,
+            'display_output': display_output,
+            'frames_per_combination': frames,
+            'text_cache': text_cache
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Find combinations whose p95 frame time regressed, returns a list of messages"""
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        limit = previous['p95_ms'] * (1 + tolerance)
+        if result['p95_ms'] > limit and result['p95_ms'] - previous['p95_ms'] > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.3f} -> {result['p95_ms']:.3f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless ORV Study Buddy rendering benchmark")
+    parser.add_argument('--frames', type=int, default=3000, help="measured frames per combination")
+    parser.add_argument('--render-mode', choices=['dirty', 'full'], default=orv.RENDER_MODE)
+    parser.add_argument('--display-output', default='sdl',
+                        help="display backend to present through (sdl, memory, file:<path>, fb:<device>)")
+    parser.add_argument('--output', default='bench_results.json', help="where to write the JSON results")
+    parser.add_argument('--baseline', help="earlier results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed p95 slowdown before failing (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.frames, args.render_mode, args.display_output)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Frame-time regressions:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("No frame-time regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,17 @@ echo "Setting up ORV Study Buddy..."
 sudo apt update && sudo apt upgrade -y
 
 # Install required packages
-sudo apt install -y python3 python3-pip python3-pygame python3-rpi.gpio
+sudo apt install -y python3 python3-pip python3-pygame python3-rpi.gpio python3-numpy
 
 # Install additional Python packages
-pip3 install --user pygame RPi.GPIO
+pip3 install --user pygame RPi.GPIO numpy
 
 # Create application directory
 mkdir -p /home/pi/orv_study_buddy
 mkdir -p /home/pi/orv_study_data
 
 # Copy the main application (you'll need to put the Python file here)
-# cp orv_study_buddy.py /home/pi/orv_study_buddy/
+# cp orv_study_buddy.py config.json /home/pi/orv_study_buddy/
 
 # Make the script executable
 chmod +x /home/pi/orv_study_buddy/orv_study_buddy.py
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+ORV Study Buddy - Accelerated-Time Simulation
+Drives the timer state machine headlessly on a manual clock, jumping straight
+from one timer deadline to the next, while replaying scripted or random input
+(button presses, notes, custom timers, power loss). Rendering and audio are
+off. Reports transitions per second, invariant violations and the data left
+in the data directory as JSON. Storage time is measured and reported apart
+from the state machine, and the default data directory is on tmpfs where
+there is one, so fsyncs do not dominate the run.
+
+    python3 orv_simulate.py --days 28
+    python3 orv_simulate.py --script week.txt --output sim.json
+    python3 orv_simulate.py --fuzz 100000 --seed 7
+
+Script lines are "<time> <action> [argument]", where time is seconds or
+H:MM:SS from the start (or "+..." relative to the previous line):
+
+    0:00:00  press              # start a work session
+    +0:10:00 press              # pause
+    +0:01:00 press              # resume
+    +1:00:00 power_loss 300     # lose power, come back 5 minutes later
+    +0:00:10 note Review ch. 4
+    +0:00:10 preset workout
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime
+
+# Must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import orv_study_buddy as orv
+from orv_study_buddy import (ORVStudyBuddy, ManualClock, TimerState, SessionJournal,
+                             StatsEngine, NotesStore, TimerCheckpoint, SyncWriter)
+
+DEFAULT_START = "2026-01-05T08:00:00"
+DAY_START_HOUR = 9
+SESSIONS_PER_DAY = 8
+
+# Temporary data directories go here when it exists (tmpfs, so fsync is nearly free)
+TMPFS_DIR = '/dev/shm'
+
+# Violations kept in the report (all of them are counted)
+MAX_REPORTED_VIOLATIONS = 20
+
+RUNNING_STATES = (TimerState.WORKING, TimerState.SHORT_BREAK, TimerState.LONG_BREAK)
+
+
+def parse_time(text):
+    """Seconds from "90", "1:30" or "0:01:30" """
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def load_script(path):
+    """Parse a script file into (seconds, action, argument) tuples"""
+    actions = []
+    at = 0.0
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split(None, 2)
+            if len(fields) < 2:
+                raise ValueError(f"{path}:{number}: expected '<time> <action> [argument]'")
+            when = fields[0]
+            at = at + parse_time(when[1:]) if when.startswith('+') else parse_time(when)
+            actions.append((at, fields[1], fields[2] if len(fields) > 2 else None))
+    return actions
+
+
+def simulation_config():
+    """The shipped config with audio off and synchronous, deterministic writes"""
+    config = copy.deepcopy(orv.load_config())
+    config.setdefault('audio_settings', {})['buzzer_enabled'] = False
+    data_settings = config.setdefault('data_settings', {})
+    data_settings['background_writes'] = False
+    data_settings['timer_checkpoint'] = True
+    config.setdefault('display_settings', {})['output'] = "sdl"
+    return config
+
+
+class TimedWriter(SyncWriter):
+    """Synchronous writer that adds up the time spent in storage"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.operations = 0
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            fn(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.operations += 1
+
+    def write_json(self, path, data):
+        self._timed(super().write_json, path, data)
+
+    def append_record(self, path, record):
+        self._timed(super().append_record, path, record)
+
+    def call(self, fn, *args):
+        self._timed(fn, *args)
+
+
+class Simulator:
+    """Runs one app instance (rebooting it on power loss) against a manual clock"""
+
+    def __init__(self, data_dir, start, config):
+        self.data_dir = data_dir
+        self.config = config
+        self.clock = ManualClock(start)
+        self.start = start
+
+        self.transitions = 0
+        self.actions = 0
+        self.boots = 0
+        self.violations = []
+        self.violation_count = 0
+        self.trace = None
+        # Shared by every boot, so storage time adds up over the whole run
+        self.writer = TimedWriter()
+
+        self.app = self._boot()
+        self.start_sessions = self.app.sessions_completed
+        self.start_journal = self.app.session_journal.total
+
+    def _boot(self):
+        self.boots += 1
+        app = ORVStudyBuddy(data_dir=self.data_dir, config=self.config, time_source=self.clock,
+                            writer=self.writer)
+        self.last_state = app.timer_state
+        return app
+
+    @property
+    def now(self):
+        return self.clock.time()
+
+    def violation(self, message):
+        self.violation_count += 1
+        if len(self.violations) < MAX_REPORTED_VIOLATIONS:
+            stamp = datetime.fromtimestamp(self.now).isoformat(timespec='seconds')
+            self.violations.append(f"{stamp} {message}")
+
+    def observe(self):
+        """Count a state transition and check the state machine invariants"""
+        app = self.app
+        state = app.timer_state
+        if state != self.last_state:
+            self.transitions += 1
+            if self.trace is not None:
+                stamp = datetime.fromtimestamp(self.now).isoformat(timespec='seconds')
+                self.trace.write(f"{stamp} {self.last_state.value} -> {state.value}\n")
+            if state == TimerState.LONG_BREAK and self.last_state == TimerState.WORKING:
+                if app.sessions_completed % app.sessions_before_long_break != 0:
+                    self.violation(f"long break after session {app.sessions_completed}")
+            if state == TimerState.SHORT_BREAK and self.last_state == TimerState.WORKING:
+                if app.sessions_completed % app.sessions_before_long_break == 0:
+                    self.violation(f"short break after session {app.sessions_completed}")
+            self.last_state = state
+
+        timer = app.scheduler.get(orv.POMODORO_TIMER)
+        if state == TimerState.IDLE and timer is not None:
+            self.violation("idle with a Pomodoro timer scheduled")
+        elif state in RUNNING_STATES and (timer is None or timer.paused):
+            self.violation(f"{state.value} without a running Pomodoro timer")
+        elif state == TimerState.PAUSED and (timer is None or not timer.paused):
+            self.violation("paused without a paused Pomodoro timer")
+        if timer is not None and not 0 <= app.get_remaining_time() <= timer.duration:
+            self.violation(f"remaining time {app.get_remaining_time():.1f} outside 0..{timer.duration:.0f}")
+
+        completed = app.sessions_completed - self.start_sessions
+        recorded = app.session_journal.total - self.start_journal
+        if completed != recorded:
+            self.violation(f"{completed} sessions completed but {recorded} recorded")
+
+    def advance_to(self, target):
+        """Move the clock to target, stopping at every timer deadline on the way"""
+        while True:
+            deadline = self.app.scheduler.next_deadline()
+            if deadline is None or deadline > target:
+                break
+            self.clock.advance(max(0.0, deadline - self.now))
+            self.app.check_timer()
+            self.observe()
+        self.clock.advance(max(0.0, target - self.now))
+        self.app.check_timer()
+        self.observe()
+
+    def power_loss(self, offline_seconds):
+        """Drop the running app without cleanup and boot a new one later"""
+        # Like a crash, the only state carried over is what is already on disk
+        self.app.checkpoint.close()
+        self.clock.advance(offline_seconds)
+        self.app = self._boot()
+        self.observe()
+
+    def perform(self, action, argument=None):
+        """Apply one input action"""
+        self.actions += 1
+        if action == 'press':
+            self.app.handle_power_button()
+        elif action == 'note':
+            self.app.add_note(argument or f"Simulated note {self.actions}")
+        elif action == 'preset':
+            if argument in self.app.timer_presets:
+                self.app.start_preset(argument)
+        elif action == 'power_loss':
+            self.power_loss(parse_time(argument or "0"))
+        elif action != 'wait':
+            raise ValueError(f"Unknown action '{action}'")
+        self.observe()
+
+    def run_script(self, actions):
+        for at, action, argument in actions:
+            self.advance_to(self.start + at)
+            self.perform(action, argument)
+
+    def run_days(self, days, sessions_per_day=SESSIONS_PER_DAY):
+        """A study routine: start each work session as soon as the previous break ends"""
+        day_start = datetime.fromtimestamp(self.start).replace(hour=DAY_START_HOUR, minute=0, second=0)
+        for day in range(days):
+            self.advance_to(day_start.timestamp() + day * 86400)
+            for _ in range(sessions_per_day):
+                self.perform('press')
+                while self.app.timer_state != TimerState.IDLE:
+                    self.advance_to(self.app.scheduler.next_deadline())
+
+    def run_fuzz(self, steps, rng):
+        """Random input, waits and power loss"""
+        presets = list(self.app.timer_presets)
+        for _ in range(steps):
+            roll = rng.random()
+            if roll < 0.45:
+                self.advance_to(self.now + rng.expovariate(1 / 600))
+            elif roll < 0.85:
+                self.perform('press')
+            elif roll < 0.90:
+                self.perform('note', f"fuzz {rng.randrange(10 ** 6)}")
+            elif roll < 0.95 and presets:
+                self.perform('preset', rng.choice(presets))
+            else:
+                # Mostly short outages, occasionally longer than a checkpoint stays valid
+                offline = rng.expovariate(1 / 600) if rng.random() < 0.9 else rng.uniform(0, 2 * 86400)
+                self.perform('power_loss', str(offline))
+
+    def finish(self):
+        """Shut down cleanly and read back what was persisted"""
+        app = self.app
+        final = {
+            'timer_state': app.timer_state.value,
+            'sessions_completed': app.sessions_completed,
+            'remaining_seconds': round(app.get_remaining_time(), 1),
+            'clock': datetime.fromtimestamp(self.now).isoformat(timespec='seconds'),
+            'memory': app.memory.stats()
+        }
+        app.writer.close()
+        app.checkpoint.close()
+
+        journal = SessionJournal(self.data_dir, time_source=self.clock)
+        stats = StatsEngine(self.data_dir, journal)
+        notes = NotesStore(self.data_dir, time_source=self.clock)
+        checkpoint = TimerCheckpoint(os.path.join(self.data_dir, 'timer.ckpt'), self.clock)
+        record = checkpoint.load()
+        checkpoint.close()
+
+        return final, {
+            'sessions': journal.total,
+            'journal_segments': len(journal.segments),
+            'stats': stats.summary(datetime.fromtimestamp(self.now).date()),
+            'notes': notes.count(),
+            'checkpoint': None if record is None else {
+                'seq': record['seq'],
+                'timer_state': record['timer_state'].value,
+                'sessions_completed': record['sessions_completed']
+            }
+        }
+
+
+def run(args, data_dir):
+    start = datetime.fromisoformat(args.start).timestamp()
+    actions = load_script(args.script) if args.script else None
+
+    # The app's own log lines are hidden unless asked for
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+        sim = Simulator(data_dir, start, simulation_config())
+        if args.trace:
+            sim.trace = open(args.trace, 'w')
+
+        wall_start = time.perf_counter()
+        io_start = sim.writer.seconds
+        try:
+            if actions is not None:
+                sim.run_script(actions)
+            elif args.fuzz:
+                sim.run_fuzz(args.fuzz, random.Random(args.seed))
+            else:
+                sim.run_days(args.days, args.sessions_per_day)
+        finally:
+            if sim.trace is not None:
+                sim.trace.close()
+        wall_seconds = time.perf_counter() - wall_start
+        io_seconds = sim.writer.seconds - io_start
+
+        simulated_seconds = sim.now - start
+        compute_seconds = wall_seconds - io_seconds
+        final, persisted = sim.finish()
+    return {
+        'meta': {
+            'mode': 'script' if args.script else 'fuzz' if args.fuzz else 'days',
+            'start': args.start,
+            'seed': args.seed,
+            'days': args.days,
+            'fuzz_steps': args.fuzz,
+            'script': args.script
+        },
+        'simulated_seconds': round(simulated_seconds, 1),
+        'simulated_days': round(simulated_seconds / 86400, 2),
+        'wall_seconds': round(wall_seconds, 3),
+        'io_seconds': round(io_seconds, 3),
+        'io_operations': sim.writer.operations,
+        'speedup': round(simulated_seconds / wall_seconds) if wall_seconds else None,
+        'actions': sim.actions,
+        'transitions': sim.transitions,
+        # Rate of the state machine alone; the second figure includes storage
+        'transitions_per_second': round(sim.transitions / compute_seconds, 1) if compute_seconds else None,
+        'transitions_per_second_with_io': round(sim.transitions / wall_seconds, 1) if wall_seconds else None,
+        'boots': sim.boots,
+        'violation_count': sim.violation_count,
+        'violations': sim.violations,
+        'final_state': final,
+        'persisted': persisted
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accelerated-time ORV Study Buddy simulation")
+    parser.add_argument('--days', type=int, default=28, help="days of the built-in study routine")
+    parser.add_argument('--sessions-per-day', type=int, default=SESSIONS_PER_DAY)
+    parser.add_argument('--script', help="replay input from a script file")
+    parser.add_argument('--fuzz', type=int, default=0, help="number of random input steps")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for --fuzz")
+    parser.add_argument('--start', default=DEFAULT_START, help="simulated start time (ISO format)")
+    parser.add_argument('--data-dir', help="keep the simulated data here instead of a temp directory")
+    parser.add_argument('--trace', help="write every state transition to this file")
+    parser.add_argument('--output', help="where to write the JSON report (default: stdout)")
+    parser.add_argument('--verbose', action='store_true', help="show the app's log output")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+        report = run(args, args.data_dir)
+    else:
+        with tempfile.TemporaryDirectory(dir=TMPFS_DIR if os.path.isdir(TMPFS_DIR) else None) as data_dir:
+            report = run(args, data_dir)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+        print(f"Report written to {args.output}")
+    else:
+        print(text)
+
+    print(f"{report['transitions']} transitions in {report['wall_seconds']} s "
+          f"({report['io_seconds']} s storage, {report['transitions_per_second']}/s without it, "
+          f"{report['simulated_days']} simulated days), {report['violation_count']} invariant violations")
+    if report['violation_count']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
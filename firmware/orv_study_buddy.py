@@ -4,23 +4,48 @@ ORV Study Buddy - Portable Study Timer with Kim Dokja Animations
 Cross-Platform Implementation (Windows/Linux/Raspberry Pi)
 """
 
-import pygame
 import time
+STARTUP_T0 = time.perf_counter()
+
+import pygame
 import json
 import os
 import threading
 from datetime import datetime, timedelta
 from enum import Enum
+from collections import OrderedDict, deque
 import math
 import sys
+import glob
+import random
+import zlib
+import zipfile
+import importlib.util
+import queue
+import mmap
+import struct
+import re
+import heapq
+import itertools
+from bisect import bisect_left, insort
+from array import array
+import tracemalloc
 
-# Platform detection
+# NumPy is only needed for desktop tone synthesis, the stats charts and RGB565 output
 try:
-    import RPi.GPIO as GPIO
-    IS_RASPBERRY_PI = True
-    print("Running on Raspberry Pi")
+    import numpy as np
+except ImportError:
+    np = None
+
+# Platform detection (RPi.GPIO itself is only imported once it is needed)
+GPIO = None
+try:
+    IS_RASPBERRY_PI = importlib.util.find_spec('RPi.GPIO') is not None
 except ImportError:
     IS_RASPBERRY_PI = False
+if IS_RASPBERRY_PI:
+    print("Running on Raspberry Pi")
+else:
     print("Running on desktop - RPi.GPIO not available")
 
 # Hardware Configuration (only used on Raspberry Pi)
@@ -28,119 +53,2776 @@ if IS_RASPBERRY_PI:
     POWER_BUTTON_PIN = 3
     BUZZER_PIN = 18
 
+# Optional settings file shipped next to this script
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+# Asset locations, searched in order (next to the script, repo layout, working directory)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIRS = [
+    os.path.join(SCRIPT_DIR, 'assets'),
+    os.path.join(SCRIPT_DIR, '..', 'assets'),
+    'assets'
+]
+
+# Character sprite sizes drawn by the UI, pre-scaled at startup
+CHARACTER_SPRITE_SIZES = (60,)
+
+# Extra room around the character for effects (book, zzz, sparkles)
+CHARACTER_BOX_PADDING = (20, 16)
+
+# Baked character animations
+BAKED_ANIMATIONS = True
+ANIMATION_CACHE_KB = 8192
+ANIMATION_BAKE_VERSION = 1
+
 # Display dimensions
 DISPLAY_WIDTH = 320
 DISPLAY_HEIGHT = 240
 
-# Timer Configuration
+# Timer Configuration (Pomodoro preset defaults, overridden by "timer_settings")
 WORK_SESSION_MINUTES = 25
 SHORT_BREAK_MINUTES = 5
 LONG_BREAK_MINUTES = 15
 SESSIONS_BEFORE_LONG_BREAK = 4
 
-# Colors (ORV themed)
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-BLUE = (70, 130, 180)
-DARK_BLUE = (25, 25, 112)
-LIGHT_GRAY = (211, 211, 211)
-DARK_GRAY = (105, 105, 105)
-GREEN = (34, 139, 34)
-RED = (220, 20, 60)
-ORANGE = (255, 165, 0)
-YELLOW = (255, 255, 0)
+# Timer scheduler
+POMODORO_TIMER = "pomodoro"
+TIMER_HEAP_SLACK = 16  # stale heap entries tolerated before the heap is compacted
+
+# Colors (ORV themed)
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+BLUE = (70, 130, 180)
+DARK_BLUE = (25, 25, 112)
+LIGHT_GRAY = (211, 211, 211)
+DARK_GRAY = (105, 105, 105)
+GREEN = (34, 139, 34)
+RED = (220, 20, 60)
+ORANGE = (255, 165, 0)
+YELLOW = (255, 255, 0)
+
+# Rendering ("dirty" redraws only the regions that changed, "full" redraws every frame)
+RENDER_MODE = "dirty"
+
+# Display output: "sdl", "fb:/dev/fb1" (framebuffer, incl. fbtft SPI panels),
+# "file:<path>" or "memory" (the last two for testing without a panel)
+DISPLAY_OUTPUT = "sdl"
+OUTPUT_SDL_DRIVER = "evdev"  # SDL's dummy video plus evdev keyboard, mouse and touch input
+HEADLESS_SDL_DRIVERS = ("dummy", "evdev", "offscreen")
+
+# Startup
+STARTUP_BUDGET_MS = 1500  # warn if the app takes longer than this to become ready
+
+# Main loop ("deadline" sleeps until the next redraw or input, "fixed" polls at FIXED_FPS)
+LOOP_MODE = "deadline"
+FIXED_FPS = 30
+ANIMATION_TICK_SECONDS = 0.1
+DEADLINE_SLACK_SECONDS = 0.002
+
+# Frame profiler (F3 toggles the overlay, F4 dumps a Chrome trace)
+PROFILE_PHASES = ('check_timer', 'update_animation', 'draw', 'present', 'wait', 'events')
+PROFILE_FRAMES = 512  # frames kept in the ring buffer
+PROFILE_OVERLAY_RECT = (0, 0, 180, 46)
+PROFILE_OVERLAY_REFRESH_SECONDS = 0.5
+
+# Power button presses, posted by the input bridge from any thread
+BUTTON_EVENT = pygame.USEREVENT + 1
+BUTTON_DEBOUNCE_SECONDS = 0.2
+INPUT_LATENCY_SAMPLES = 256
+
+# Screen regions tracked by the dirty-rectangle renderer
+SPRITE_RECT = pygame.Rect(120, 62, 80, 76)
+TIMER_RECT = pygame.Rect(80, 138, 160, 26)
+STATUS_RECT = pygame.Rect(0, 170, DISPLAY_WIDTH, 20)
+SESSION_RECT = pygame.Rect(0, 192, DISPLAY_WIDTH, 16)
+NOTES_LIST_RECT = pygame.Rect(0, 38, DISPLAY_WIDTH, 162)
+NOTE_INPUT_RECT = pygame.Rect(120, 200, 190, 30)
+STATS_BODY_RECT = pygame.Rect(0, 38, DISPLAY_WIDTH, DISPLAY_HEIGHT - 38)
+
+# Tone synthesis (desktop buzzer)
+TONE_MAX_AMPLITUDE = 8192
+TONE_FADE_SECONDS = 0.005
+
+# Audio worker
+AUDIO_QUEUE_SIZE = 4
+AUDIO_OVERLAP_POLICY = "coalesce"  # "coalesce", "drop" or "replace"
+
+# Chime patterns as (frequency, duration, gap) steps, relative to the configured
+# buzzer_frequency and buzzer_duration (the defaults give 800/1000/1200 Hz over one second)
+BUZZER_FREQUENCY = 1000
+BUZZER_DURATION_SECONDS = 1.0
+TONE_PATTERNS = {
+    'work_end': [(0.8, 0.25, 0.05), (1.0, 0.25, 0.05), (1.2, 0.5, 0.0)],
+    'break_end': [(1.2, 0.2, 0.05), (0.9, 0.2, 0.05), (1.2, 0.4, 0.0)],
+}
+
+# Background persistence
+WRITER_QUEUE_SIZE = 64
+BACKGROUND_WRITES = True
+
+# Session journal
+JOURNAL_COMPACT_RECORDS = 256  # records in the active journal before it becomes a segment
+JOURNAL_TAIL_SIZE = 128  # recent sessions kept in the tail index
+
+# Timer checkpoint (two fixed-size slots in a memory-mapped file)
+CHECKPOINT_MAGIC = b'ORVT'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_SLOT = struct.Struct('<4sBBBxQIddddd16s')  # followed by a CRC32
+CHECKPOINT_SLOT_SIZE = 128
+CHECKPOINT_INTERVAL_SECONDS = 1.0  # in-place update while a timer runs
+CHECKPOINT_SYNC_SECONDS = 10.0  # how often those updates are forced to storage
+CHECKPOINT_MAX_OFFLINE_HOURS = 12  # older running timers are dropped on restore
+BOOT_ID_PATH = '/proc/sys/kernel/random/boot_id'
+
+# Session analytics (stats screen charts)
+SESSION_TYPES = ("work", "short_break", "long_break")
+HEATMAP_WEEKS = 16
+STATS_CHART_RECT = pygame.Rect(10, 172, 300, 62)
+
+# Notes store
+NOTES_CHUNK_SIZE = 64  # notes per chunk file
+NOTES_CHUNK_CACHE = 4  # parsed chunks kept in memory
+DEFAULT_MAX_NOTES = 100
+
+# Notes search
+NOTE_TOKEN_PATTERN = re.compile(r"\w+")
+SEARCH_RESULTS = 50  # matches listed on the notes screen
+
+# Notes list view
+NOTE_ROW_MAX_LINES = 3  # long notes wrap onto this many lines
+NOTE_ROW_PADDING = 6
+NOTE_SCROLL_FPS = 30  # redraw rate while the list is moving
+NOTE_SCROLL_FRICTION = 3.0  # exponential velocity decay per second after a fling
+NOTE_SCROLL_MIN_SPEED = 15.0  # px/s below which a fling stops
+NOTE_SCROLL_WHEEL_SPEED = 600.0  # px/s per mouse wheel notch
+
+# Maximum number of rendered text surfaces kept by the text cache
+TEXT_CACHE_SIZE = 128
+
+# Memory budget shared by every in-memory cache (text, sprites, animations, notes, sounds, history)
+MEMORY_BUDGET_KB = 16384
+MEMORY_REPORT_MINUTES = 60  # how often RSS and cache usage are appended to memory.jsonl
+MEMORY_TRACE_FRAMES = 8  # traceback depth recorded when tracemalloc diagnostics are on
+MEMORY_DUMP_TOP = 25  # allocation sites listed in a memory dump
+PROC_STATUS_PATH = '/proc/self/status'
+
+class TimerState(Enum):
+    IDLE = "idle"
+    WORKING = "working"
+    SHORT_BREAK = "short_break"
+    LONG_BREAK = "long_break"
+    PAUSED = "paused"
+
+class KimDokjaState(Enum):
+    IDLE = "idle"
+    WORKING = "working"
+    RESTING = "resting"
+    CELEBRATING = "celebrating"
+
+TIMER_STATE_CODES = list(TimerState)
+CHARACTER_STATE_CODES = list(KimDokjaState)
+
+def read_boot_id():
+    """Get the kernel boot id as 16 bytes, or zeros where there is none"""
+    try:
+        with open(BOOT_ID_PATH, 'r') as f:
+            return bytes.fromhex(f.read().strip().replace('-', ''))[:16].ljust(16, b'\0')
+    except (OSError, ValueError):
+        return bytes(16)
+
+def read_rss():
+    """Get the resident set size of this process in bytes, or None where /proc is missing"""
+    try:
+        with open(PROC_STATUS_PATH, 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def surface_bytes(surface):
+    """Bytes of pixel memory held by a surface"""
+    return surface.get_pitch() * surface.get_height()
+
+def load_gpio():
+    """Import RPi.GPIO on first use"""
+    global GPIO
+    if GPIO is None:
+        import RPi.GPIO
+        GPIO = RPi.GPIO
+    return GPIO
+
+def load_config(path=CONFIG_PATH):
+    """Load config.json, returning an empty dict if it is missing or invalid"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fsync_dir(path):
+    """Flush a directory entry so renames survive a power cut (no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file and rename it over the target"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path))
+
+def append_jsonl(path, record):
+    """Append one JSON record as a line and fsync it"""
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    with open(path, 'a') as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+def write_jsonl(path, records):
+    """Write a whole JSON-lines file and fsync it"""
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_jsonl(path, repair=False):
+    """Read JSON-lines records, skipping a torn last line (and truncating it if repair is set)"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    
+    end = data.rfind(b'\n') + 1
+    if repair and end < len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+class SyncWriter:
+    """Performs data-directory writes immediately on the calling thread"""
+    
+    def write_json(self, path, data):
+        write_json_atomic(path, data)
+    
+    def append_record(self, path, record):
+        append_jsonl(path, record)
+    
+    def call(self, fn, *args):
+        fn(*args)
+    
+    def pending(self):
+        return 0
+    
+    def flush(self, timeout=None):
+        return True
+    
+    def close(self):
+        pass
+    
+    def stats(self):
+        return {'queue_depth': 0}
+
+class BackgroundWriter:
+    """Performs data-directory writes on a background thread
+    
+    Appends and calls run in submission order. Whole-file JSON writes are
+    atomic (temp file + rename) and coalesced: if a write to the same path is
+    still queued, only the newest data is written. The queue is bounded, so
+    if storage falls far behind, callers block instead of using unbounded
+    memory.
+    """
+    
+    def __init__(self, max_queue=WRITER_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._pending_json = {}
+        
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.max_io_ms = 0.0
+        self._io_total_ms = 0.0
+        
+        self._thread = threading.Thread(target=self._run, name="data-writer", daemon=True)
+        self._thread.start()
+    
+    def write_json(self, path, data):
+        """Atomically replace a JSON file, coalescing with a queued write to the same path"""
+        payload = json.dumps(data)
+        with self._lock:
+            if path in self._pending_json:
+                self._pending_json[path] = payload
+                self.coalesced += 1
+                return
+            self._pending_json[path] = payload
+        self._queue.put(('json', path, None, time.perf_counter()))
+    
+    def append_record(self, path, record):
+        """Append one JSON line, in order with every other operation"""
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self._queue.put(('append', path, line, time.perf_counter()))
+    
+    def call(self, fn, *args):
+        """Run a file operation (rename, archive, ...) in order on the writer thread"""
+        self._queue.put(('call', fn, args, time.perf_counter()))
+    
+    def _write_json(self, path):
+        with self._lock:
+            payload = self._pending_json.pop(path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        fsync_dir(os.path.dirname(path))
+    
+    def _append(self, path, line):
+        with open(path, 'a') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            
+            kind, target, payload, enqueued = item
+            start = time.perf_counter()
+            try:
+                if kind == 'json':
+                    self._write_json(target)
+                elif kind == 'append':
+                    self._append(target, payload)
+                else:
+                    target(*payload)
+                self.writes += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Background write failed: {e}")
+            finally:
+                end = time.perf_counter()
+                io_ms = (end - start) * 1000
+                self._io_total_ms += io_ms
+                self.max_io_ms = max(self.max_io_ms, io_ms)
+                self.last_latency_ms = (end - enqueued) * 1000
+                self.max_latency_ms = max(self.max_latency_ms, self.last_latency_ms)
+                self._queue.task_done()
+    
+    def pending(self):
+        """Number of queued operations"""
+        return self._queue.qsize()
+    
+    def flush(self, timeout=None):
+        """Wait until every queued write has hit the disk"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+    
+    def close(self):
+        """Flush everything and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+    
+    def stats(self):
+        """Get queue depth and write latency"""
+        return {
+            'queue_depth': self.pending(),
+            'writes': self.writes,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'last_latency_ms': round(self.last_latency_ms, 2),
+            'max_latency_ms': round(self.max_latency_ms, 2),
+            'avg_io_ms': round(self._io_total_ms / self.writes, 2) if self.writes else 0.0,
+            'max_io_ms': round(self.max_io_ms, 2)
+        }
+
+class SessionJournal:
+    """Append-only session log with dated segments and a small tail index
+    
+    New sessions are appended to sessions.jsonl. When the active journal gets
+    large, or its first record is from an earlier day, it is renamed into
+    sessions/segment-NNNNN-YYYY-MM-DD.jsonl. sessions.idx.json lists the
+    segments and keeps the most recent records so the tail can be read
+    without scanning the history.
+    """
+    
+    def __init__(self, data_dir, writer=None, time_source=None):
+        self.data_dir = data_dir
+        self.writer = writer or SyncWriter()
+        self.time_source = time_source or SystemClock()
+        self.journal_path = os.path.join(data_dir, 'sessions.jsonl')
+        self.index_path = os.path.join(data_dir, 'sessions.idx.json')
+        self.segment_dir = os.path.join(data_dir, 'sessions')
+        self.legacy_path = os.path.join(data_dir, 'sessions.json')
+        
+        self.segments = []
+        self.tail = deque(maxlen=JOURNAL_TAIL_SIZE)
+        self.total = 0
+        self.active = []
+        # Records of segments whose file is still queued on the writer
+        self._unwritten_segments = {}
+        self.open()
+    
+    def open(self):
+        """Load the index and the active journal, migrating sessions.json if needed"""
+        os.makedirs(self.segment_dir, exist_ok=True)
+        
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            self.segments = index.get('segments', [])
+            self.tail.extend(index.get('tail', []))
+        except (OSError, ValueError):
+            self.segments = []
+        
+        # Segments renamed right before a crash may be missing from the index
+        known = {segment['name'] for segment in self.segments}
+        unindexed = sorted(name for name in os.listdir(self.segment_dir)
+                           if name.endswith('.jsonl') and name not in known)
+        for name in unindexed:
+            records = read_jsonl(os.path.join(self.segment_dir, name))
+            self.segments.append(self._segment_entry(name, records))
+            self.tail.extend(records)
+        
+        # The active journal is small (it is rolled over often), so it is kept in memory
+        self.active = read_jsonl(self.journal_path, repair=True)
+        self.tail.extend(self.active)
+        self.total = sum(segment['count'] for segment in self.segments) + len(self.active)
+        
+        if unindexed:
+            self._write_index()
+        
+        if os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+    
+    def _migrate_legacy(self):
+        """Move an old read-modify-write sessions.json into a journal segment"""
+        try:
+            with open(self.legacy_path, 'r') as f:
+                sessions = json.load(f)
+        except (OSError, ValueError):
+            sessions = []
+        
+        if sessions:
+            self._write_segment(sessions)
+            print(f"Migrated {len(sessions)} sessions from sessions.json")
+        self.writer.call(os.replace, self.legacy_path, self.legacy_path + '.migrated')
+    
+    def _segment_entry(self, name, records):
+        """Build the index entry for a segment"""
+        return {
+            'name': name,
+            'count': len(records),
+            'first': records[0].get('timestamp') if records else None,
+            'last': records[-1].get('timestamp') if records else None
+        }
+    
+    def _next_segment_name(self, first_timestamp):
+        """Name the next dated segment file"""
+        date = (first_timestamp or datetime.fromtimestamp(self.time_source.time()).isoformat())[:10]
+        return f"segment-{len(self.segments):05d}-{date}.jsonl"
+    
+    def _write_segment(self, records):
+        """Write already-known records as a new segment (used for migration)"""
+        name = self._next_segment_name(records[0].get('timestamp'))
+        self._unwritten_segments[name] = records
+        self.writer.call(self._write_segment_file, name, records)
+        
+        self.segments.append(self._segment_entry(name, records))
+        self.total += len(records)
+        self.tail = deque(records + list(self.tail), maxlen=JOURNAL_TAIL_SIZE)
+        self._write_index()
+    
+    def _write_segment_file(self, name, records):
+        write_jsonl(os.path.join(self.segment_dir, name), records)
+        self._unwritten_segments.pop(name, None)
+    
+    def _write_index(self):
+        """Persist the segment list and the tail, in order with the segment renames"""
+        self.writer.call(write_json_atomic, self.index_path, {
+            'version': 1,
+            'segments': [dict(segment) for segment in self.segments],
+            'tail': list(self.tail)
+        })
+    
+    def append(self, record):
+        """Durably append one session record"""
+        date = record['timestamp'][:10]
+        if self.active and (len(self.active) >= JOURNAL_COMPACT_RECORDS
+                            or self.active[0]['timestamp'][:10] != date):
+            self.compact()
+        
+        self.writer.append_record(self.journal_path, record)
+        self.active.append(record)
+        self.total += 1
+        self.tail.append(record)
+    
+    def compact(self):
+        """Roll the active journal into a dated segment file"""
+        if not self.active:
+            return
+        
+        name = self._next_segment_name(self.active[0]['timestamp'])
+        self._unwritten_segments[name] = self.active
+        self.writer.call(self._rename_journal, name)
+        
+        self.segments.append(self._segment_entry(name, self.active))
+        self.active = []
+        self._write_index()
+    
+    def _rename_journal(self, name):
+        os.replace(self.journal_path, os.path.join(self.segment_dir, name))
+        fsync_dir(self.segment_dir)
+        fsync_dir(self.data_dir)
+        self._unwritten_segments.pop(name, None)
+    
+    def last(self, count):
+        """Get the most recent sessions"""
+        if count <= 0:
+            return []
+        return list(self.tail)[-count:]
+    
+    def sessions_today(self):
+        """Count the sessions logged today (the tail holds far more than a day of sessions)"""
+        today = datetime.fromtimestamp(self.time_source.time()).date().isoformat()
+        return sum(1 for record in self.tail if record['timestamp'].startswith(today))
+    
+    def iter_records(self):
+        """Iterate over the full history, oldest first, without waiting for the writer"""
+        segments = list(self.segments)
+        active = list(self.active)
+        # Taken before any file is read: a segment missing here is already on disk
+        unwritten = dict(self._unwritten_segments)
+        for segment in segments:
+            records = unwritten.get(segment['name'])
+            if records is None:
+                records = read_jsonl(os.path.join(self.segment_dir, segment['name']))
+            yield from records
+        yield from active
+
+class StatsEngine:
+    """Running focus-time aggregates, updated in O(1) for each completed session
+    
+    The aggregates live in stats.json and can always be rebuilt from the
+    session journal if that file is lost or out of step with it.
+    """
+    
+    def __init__(self, data_dir, journal, writer=None):
+        self.path = os.path.join(data_dir, 'stats.json')
+        self.journal = journal
+        self.writer = writer or SyncWriter()
+        self.data = self._empty()
+        
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.rebuild()
+            return
+        
+        if self.data.get('total_sessions') != journal.total:
+            self.rebuild()
+    
+    def _empty(self):
+        """Get an empty set of aggregates"""
+        return {
+            'version': 1,
+            'day_minutes': {},
+            'week_minutes': {},
+            'total_minutes': 0,
+            'total_sessions': 0,
+            'current_streak': 0,
+            'longest_streak': 0,
+            'last_day': None
+        }
+    
+    def _add(self, timestamp, minutes):
+        """Fold one session into the aggregates"""
+        day = timestamp.date()
+        day_key = day.isoformat()
+        iso_year, iso_week, _ = day.isocalendar()
+        week_key = f"{iso_year}-W{iso_week:02d}"
+        
+        data = self.data
+        data['day_minutes'][day_key] = data['day_minutes'].get(day_key, 0) + minutes
+        data['week_minutes'][week_key] = data['week_minutes'].get(week_key, 0) + minutes
+        data['total_minutes'] += minutes
+        data['total_sessions'] += 1
+        
+        last_day = data['last_day']
+        if last_day != day_key:
+            if last_day == (day - timedelta(days=1)).isoformat():
+                data['current_streak'] += 1
+            else:
+                data['current_streak'] = 1
+            data['longest_streak'] = max(data['longest_streak'], data['current_streak'])
+            data['last_day'] = day_key
+    
+    def record(self, session):
+        """Add a completed session and persist the aggregates"""
+        self._add(datetime.fromisoformat(session['timestamp']), session['duration_minutes'])
+        self.save()
+    
+    def rebuild(self):
+        """Recompute every aggregate from the session journal"""
+        self.data = self._empty()
+        for session in self.journal.iter_records():
+            try:
+                self._add(datetime.fromisoformat(session['timestamp']), session['duration_minutes'])
+            except (KeyError, ValueError):
+                continue
+        self.save()
+        print(f"Rebuilt stats from {self.data['total_sessions']} sessions")
+    
+    def save(self):
+        """Write the aggregates to disk"""
+        try:
+            self.writer.write_json(self.path, self.data)
+        except OSError as e:
+            print(f"Error saving stats: {e}")
+    
+    def summary(self, today=None):
+        """Get the numbers shown on the stats screen"""
+        today = today or datetime.fromtimestamp(self.journal.time_source.time()).date()
+        iso_year, iso_week, _ = today.isocalendar()
+        data = self.data
+        
+        # A streak only counts if the last session was today or yesterday
+        streak = data['current_streak']
+        if data['last_day'] not in (today.isoformat(), (today - timedelta(days=1)).isoformat()):
+            streak = 0
+        
+        return {
+            'today_minutes': data['day_minutes'].get(today.isoformat(), 0),
+            'week_minutes': data['week_minutes'].get(f"{iso_year}-W{iso_week:02d}", 0),
+            'total_minutes': data['total_minutes'],
+            'total_sessions': data['total_sessions'],
+            'current_streak': streak,
+            'longest_streak': data['longest_streak']
+        }
+
+class SessionAnalytics:
+    """Columnar NumPy view of the whole session history
+    
+    Sessions are held as parallel arrays (local epoch seconds, minutes,
+    type code) and cached in sessions.npz, so loading years of history is a
+    single binary read. The cache remembers how many journal records it
+    covers; sessions added since are taken from the journal tail. Timestamps
+    are local wall time counted as if it were UTC, so days and hours fall out
+    of integer division.
+    """
+    
+    def __init__(self, data_dir, journal, writer=None):
+        self.path = os.path.join(data_dir, 'sessions.npz')
+        self.journal = journal
+        self.writer = writer or SyncWriter()
+        self.size = 0
+        self.version = 0
+        self._epoch = np.zeros(64, dtype=np.int64)
+        self._minutes = np.zeros(64, dtype=np.float32)
+        self._kind = np.zeros(64, dtype=np.uint8)
+        self.load()
+    
+    @property
+    def epoch(self):
+        return self._epoch[:self.size]
+    
+    @property
+    def minutes(self):
+        return self._minutes[:self.size]
+    
+    @property
+    def kind(self):
+        return self._kind[:self.size]
+    
+    @property
+    def nbytes(self):
+        """Bytes held by the columns, including their spare capacity"""
+        return self._epoch.nbytes + self._minutes.nbytes + self._kind.nbytes
+    
+    @staticmethod
+    def local_epoch(timestamp):
+        """Seconds since 1970-01-01 of a naive local ISO timestamp"""
+        return int((datetime.fromisoformat(timestamp) - datetime(1970, 1, 1)).total_seconds())
+    
+    def _reserve(self, count):
+        """Grow the columns (doubling) to hold count more sessions"""
+        needed = self.size + count
+        if needed <= len(self._epoch):
+            return
+        capacity = max(needed, 2 * len(self._epoch))
+        for name in ('_epoch', '_minutes', '_kind'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+    
+    def _extend(self, records):
+        """Append journal records to the columns"""
+        rows = []
+        for record in records:
+            try:
+                kind = SESSION_TYPES.index(record.get('type', 'work'))
+                rows.append((self.local_epoch(record['timestamp']), record['duration_minutes'], kind))
+            except (KeyError, ValueError):
+                continue
+        if not rows:
+            return
+        self._reserve(len(rows))
+        epoch, minutes, kind = zip(*rows)
+        end = self.size + len(rows)
+        self._epoch[self.size:end] = epoch
+        self._minutes[self.size:end] = minutes
+        self._kind[self.size:end] = kind
+        self.size = end
+        self.version += 1
+    
+    def load(self):
+        """Load the binary cache and catch up with the journal"""
+        covered = 0
+        try:
+            with np.load(self.path) as cache:
+                covered = int(cache['records'])
+                if covered <= self.journal.total:
+                    count = len(cache['epoch'])
+                    self._reserve(count)
+                    self._epoch[:count] = cache['epoch']
+                    self._minutes[:count] = cache['minutes']
+                    self._kind[:count] = cache['kind']
+                    self.size = count
+                else:
+                    covered = 0
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # A damaged or truncated cache is rebuilt from the journal below
+            covered = 0
+        
+        missing = self.journal.total - covered
+        if missing == 0:
+            return
+        if 0 < missing <= len(self.journal.tail) and self.size:
+            self._extend(list(self.journal.tail)[-missing:])
+        else:
+            self.size = 0
+            self._extend(self.journal.iter_records())
+        self.save()
+    
+    def record(self, session):
+        """Add a completed session"""
+        self._extend([session])
+        self.save()
+    
+    def save(self):
+        """Write the columns to sessions.npz on the writer thread"""
+        self.writer.call(self._write_cache, self.epoch.copy(), self.minutes.copy(),
+                         self.kind.copy(), self.journal.total)
+    
+    def _write_cache(self, epoch, minutes, kind, records):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, epoch=epoch, minutes=minutes, kind=kind, records=np.int64(records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(os.path.dirname(self.path))
+    
+    def _work(self):
+        work = self.kind == 0
+        return self.epoch[work], self.minutes[work]
+    
+    def heatmap(self, today, weeks=HEATMAP_WEEKS):
+        """Focus minutes per day as a (7, weeks) grid, Monday rows first, this week last"""
+        epoch, minutes = self._work()
+        today_index = (today - datetime(1970, 1, 1).date()).days
+        # 1970-01-01 was a Thursday, so Monday-based weekdays are (day + 3) % 7
+        first_day = today_index - (today_index + 3) % 7 - 7 * (weeks - 1)
+        offsets = epoch // 86400 - first_day
+        shown = (offsets >= 0) & (offsets < 7 * weeks)
+        days = np.bincount(offsets[shown], weights=minutes[shown], minlength=7 * weeks)
+        return days[:7 * weeks].reshape(weeks, 7).T
+    
+    def hour_histogram(self):
+        """Total focus minutes started in each hour of the day"""
+        epoch, minutes = self._work()
+        return np.bincount((epoch % 86400) // 3600, weights=minutes, minlength=24)
+    
+    def weekly_totals(self, today, weeks=HEATMAP_WEEKS):
+        """Focus minutes of each of the last weeks, oldest first"""
+        return self.heatmap(today, weeks).sum(axis=0)
+    
+    def streaks(self, today):
+        """Get (current, longest) runs of consecutive days with a work session"""
+        epoch, _ = self._work()
+        if not len(epoch):
+            return 0, 0
+        days = np.unique(epoch // 86400)
+        breaks = np.flatnonzero(np.diff(days) != 1)
+        starts = np.concatenate(([0], breaks + 1))
+        ends = np.concatenate((breaks, [len(days) - 1]))
+        lengths = ends - starts + 1
+        
+        today_index = (today - datetime(1970, 1, 1).date()).days
+        current = int(lengths[-1]) if days[-1] >= today_index - 1 else 0
+        return current, int(lengths.max())
+
+class NotesStore:
+    """Chunked, append-only notes storage with a bounded live window
+    
+    Note N is stored in notes/<N // NOTES_CHUNK_SIZE>.jsonl. Only the newest
+    max_notes ids are live; chunks that fall completely out of that window
+    are moved to notes/archive/ (or deleted). Chunks are parsed on demand
+    and only a few are kept in memory, so appends and page loads cost the
+    same no matter how many notes the device holds.
+    """
+    
+    def __init__(self, data_dir, max_notes=DEFAULT_MAX_NOTES, archive=True, writer=None, memory=None,
+                 time_source=None):
+        self.data_dir = data_dir
+        self.writer = writer or SyncWriter()
+        self.time_source = time_source or SystemClock()
+        self.memory = memory or MemoryAccountant()
+        self.memory.register('notes', self.evict)
+        self.notes_dir = os.path.join(data_dir, 'notes')
+        self.archive_dir = os.path.join(self.notes_dir, 'archive')
+        self.legacy_path = os.path.join(data_dir, 'notes.json')
+        self.max_notes = max(1, max_notes)
+        self.archive = archive
+        
+        self.next_id = 0
+        self._chunks = OrderedDict()
+        # Appended notes still queued on the writer, by id
+        self._unwritten = {}
+        self.open()
+    
+    @property
+    def first_id(self):
+        """Oldest live note id"""
+        return max(0, self.next_id - self.max_notes)
+    
+    def count(self):
+        """Number of live notes"""
+        return self.next_id - self.first_id
+    
+    def _chunk_path(self, chunk):
+        return os.path.join(self.notes_dir, f"{chunk:06d}.jsonl")
+    
+    def _chunk_files(self):
+        """Get the chunk numbers present on disk, oldest first"""
+        chunks = []
+        for name in os.listdir(self.notes_dir):
+            if name.endswith('.jsonl') and name[:-6].isdigit():
+                chunks.append(int(name[:-6]))
+        return sorted(chunks)
+    
+    def open(self):
+        """Find the next note id from the newest chunk, migrating notes.json if needed"""
+        os.makedirs(self.notes_dir, exist_ok=True)
+        
+        chunks = self._chunk_files()
+        if chunks:
+            records = read_jsonl(self._chunk_path(chunks[-1]), repair=True)
+            if records:
+                self.next_id = records[-1]['id'] + 1
+            else:
+                self.next_id = chunks[-1] * NOTES_CHUNK_SIZE
+        
+        if os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+        
+        self._retire_chunks()
+    
+    def _migrate_legacy(self):
+        """Import an old notes.json list"""
+        try:
+            with open(self.legacy_path, 'r') as f:
+                notes = json.load(f)
+        except (OSError, ValueError):
+            notes = []
+        
+        for text in notes:
+            self.append(text, retire=False)
+        if notes:
+            print(f"Migrated {len(notes)} notes from notes.json")
+        self.writer.call(os.replace, self.legacy_path, self.legacy_path + '.migrated')
+    
+    def _retire_chunks(self):
+        """Archive or delete chunks that are entirely older than the live window"""
+        oldest_live_chunk = self.first_id // NOTES_CHUNK_SIZE
+        for chunk in list(self._chunks):
+            if chunk < oldest_live_chunk:
+                del self._chunks[chunk]
+                self.memory.remove('notes', chunk)
+        self.writer.call(self._retire_files, oldest_live_chunk)
+    
+    def _retire_files(self, oldest_live_chunk):
+        for chunk in self._chunk_files():
+            if chunk >= oldest_live_chunk:
+                break
+            path = self._chunk_path(chunk)
+            if self.archive:
+                os.makedirs(self.archive_dir, exist_ok=True)
+                os.replace(path, os.path.join(self.archive_dir, os.path.basename(path)))
+            else:
+                os.remove(path)
+    
+    def _cache_chunk(self, chunk, notes):
+        """Keep a parsed chunk, dropping the least recently used one past NOTES_CHUNK_CACHE"""
+        self._chunks[chunk] = notes
+        self._account(chunk)
+        if len(self._chunks) > NOTES_CHUNK_CACHE:
+            evicted, _ = self._chunks.popitem(last=False)
+            self.memory.remove('notes', evicted)
+    
+    def _account(self, chunk):
+        notes = self._chunks[chunk]
+        self.memory.add('notes', chunk, sys.getsizeof(notes) + sum(map(sys.getsizeof, notes.values())))
+    
+    def _load_chunk(self, chunk):
+        """Get a parsed chunk as {id: text}, keeping only a few in memory"""
+        notes = self._chunks.get(chunk)
+        if notes is not None:
+            self._chunks.move_to_end(chunk)
+            self.memory.touch('notes', chunk)
+            return notes
+        
+        # Queued appends are merged from memory rather than waiting for the writer;
+        # the snapshot is taken first, so a note missing from it is already in the file
+        unwritten = dict(self._unwritten)
+        notes = {record['id']: record['text'] for record in read_jsonl(self._chunk_path(chunk))}
+        for note_id, text in unwritten.items():
+            if note_id // NOTES_CHUNK_SIZE == chunk:
+                notes[note_id] = text
+        self._cache_chunk(chunk, notes)
+        return notes
+    
+    def evict(self, chunk):
+        """Drop a parsed chunk; it is read back from disk when next needed"""
+        self._chunks.pop(chunk, None)
+    
+    def append(self, text, retire=True):
+        """Append a note in O(1), returns its id"""
+        note_id = self.next_id
+        chunk = note_id // NOTES_CHUNK_SIZE
+        stamp = datetime.fromtimestamp(self.time_source.time()).isoformat(timespec='seconds')
+        record = {'id': note_id, 'time': stamp, 'text': text}
+        self._unwritten[note_id] = text
+        self.writer.append_record(self._chunk_path(chunk), record)
+        self.writer.call(self._unwritten.pop, note_id, None)
+        
+        if chunk in self._chunks:
+            self._chunks[chunk][note_id] = text
+            self._account(chunk)
+        elif note_id % NOTES_CHUNK_SIZE == 0:
+            # A fresh chunk is known in full, so it never has to be read back
+            self._cache_chunk(chunk, {note_id: text})
+        self.next_id += 1
+        
+        # The live window only moves into a new chunk once every NOTES_CHUNK_SIZE notes
+        if retire and self.first_id % NOTES_CHUNK_SIZE == 0 and self.first_id > 0:
+            self._retire_chunks()
+        return note_id
+    
+    def get(self, note_id):
+        """Get the text of a live note, or None"""
+        if not self.first_id <= note_id < self.next_id:
+            return None
+        return self._load_chunk(note_id // NOTES_CHUNK_SIZE).get(note_id)
+    
+    def get_range(self, start_id, end_id):
+        """Get live notes with start_id <= id < end_id as (id, text) pairs"""
+        start_id = max(start_id, self.first_id)
+        end_id = min(end_id, self.next_id)
+        notes = []
+        for note_id in range(start_id, end_id):
+            text = self._load_chunk(note_id // NOTES_CHUNK_SIZE).get(note_id)
+            if text is not None:
+                notes.append((note_id, text))
+        return notes
+    
+    def latest(self, count):
+        """Get the newest notes, oldest first"""
+        return self.get_range(self.next_id - count, self.next_id)
+
+class NoteIndex:
+    """Inverted index from note tokens to note ids, for search as you type
+    
+    Each added note appends one line to notes/index.jsonl, so startup only
+    replays that log and never re-tokenizes the notes. Postings are kept in
+    id order and the vocabulary is a sorted list, so a prefix query is a
+    bisect plus a scan over the matching tokens. Ids that have left the live
+    window are skipped at query time and dropped when the log is compacted.
+    """
+    
+    def __init__(self, notes_store, writer=None):
+        self.notes_store = notes_store
+        self.writer = writer or SyncWriter()
+        self.path = os.path.join(notes_store.notes_dir, 'index.jsonl')
+        
+        self.postings = {}
+        self.tokens = []
+        self.last_id = -1
+        self.log_records = 0
+        self.version = 0
+        self.open()
+    
+    @staticmethod
+    def tokenize(text):
+        """Get the distinct lowercase words of a text, in order"""
+        return list(dict.fromkeys(NOTE_TOKEN_PATTERN.findall(text.lower())))
+    
+    def open(self):
+        """Replay the index log, then index any notes it missed"""
+        for record in read_jsonl(self.path, repair=True):
+            if record['id'] >= self.notes_store.next_id:
+                # The note itself was lost with the crash that followed it
+                continue
+            self._insert(record['id'], record['tokens'])
+            self.log_records += 1
+        
+        # Notes are written before their index line, so at most a few are missing
+        for note_id, text in self.notes_store.get_range(self.last_id + 1, self.notes_store.next_id):
+            self.add(note_id, text)
+    
+    def _insert(self, note_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                self.postings[token] = [note_id]
+                insort(self.tokens, token)
+            elif ids[-1] != note_id:
+                ids.append(note_id)
+        self.last_id = max(self.last_id, note_id)
+        self.version += 1
+    
+    def add(self, note_id, text):
+        """Index a new note and log it"""
+        tokens = self.tokenize(text)
+        self._insert(note_id, tokens)
+        self.writer.append_record(self.path, {'id': note_id, 'tokens': tokens})
+        self.log_records += 1
+        if self.log_records > 2 * self.notes_store.max_notes + NOTES_CHUNK_SIZE:
+            self.compact()
+    
+    def compact(self):
+        """Drop retired ids from memory and rewrite the log with live notes only"""
+        first_id = self.notes_store.first_id
+        by_note = {}
+        for token in list(self.tokens):
+            ids = self.postings[token]
+            live = ids[bisect_left(ids, first_id):]
+            if live:
+                self.postings[token] = live
+                for note_id in live:
+                    by_note.setdefault(note_id, []).append(token)
+            else:
+                del self.postings[token]
+        self.tokens = sorted(self.postings)
+        
+        records = [{'id': note_id, 'tokens': by_note[note_id]} for note_id in sorted(by_note)]
+        self.writer.call(self._rewrite_log, records)
+        self.log_records = len(records)
+        self.version += 1
+    
+    def _rewrite_log(self, records):
+        tmp_path = self.path + '.tmp'
+        write_jsonl(tmp_path, records)
+        os.replace(tmp_path, self.path)
+        fsync_dir(os.path.dirname(self.path))
+    
+    def _prefix_ids(self, prefix, first_id):
+        """Live ids of notes containing a word that starts with prefix"""
+        ids = set()
+        i = bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            postings = self.postings[self.tokens[i]]
+            ids.update(postings[bisect_left(postings, first_id):])
+            i += 1
+        return ids
+    
+    def search(self, query, limit=SEARCH_RESULTS):
+        """Get ids of live notes matching every word of the query as a prefix, newest first"""
+        words = self.tokenize(query)
+        if not words:
+            return []
+        
+        first_id = self.notes_store.first_id
+        # Narrow the longest (most selective) prefix first
+        words.sort(key=len, reverse=True)
+        matches = self._prefix_ids(words[0], first_id)
+        for word in words[1:]:
+            if not matches:
+                break
+            matches &= self._prefix_ids(word, first_id)
+        return sorted(matches, reverse=True)[:limit]
+
+class TimerCheckpoint:
+    """Memory-mapped, fixed-layout record of the running timer
+    
+    Updating it is a struct pack into mapped memory, so it can run on every
+    state change and about once a second. The record is written to two slots
+    in turn, each with a sequence number and a CRC, so a write torn by power
+    loss always leaves the previous one readable. Wall-clock time, monotonic
+    time and the boot id are stored together, so on restore the time spent
+    switched off can be measured even when the wall clock cannot be trusted.
+    """
+    
+    def __init__(self, path, time_source, writer=None):
+        self.path = path
+        self.time_source = time_source
+        self.writer = writer or SyncWriter()
+        self.boot_id = read_boot_id()
+        self.seq = 0
+        self.last_save = float('-inf')
+        self.last_sync = None
+        
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != 2 * CHECKPOINT_SLOT_SIZE:
+                os.ftruncate(fd, 2 * CHECKPOINT_SLOT_SIZE)
+            self._map = mmap.mmap(fd, 2 * CHECKPOINT_SLOT_SIZE)
+        finally:
+            os.close(fd)
+    
+    def _read_slot(self, slot):
+        offset = slot * CHECKPOINT_SLOT_SIZE
+        body = self._map[offset:offset + CHECKPOINT_SLOT.size]
+        crc, = struct.unpack_from('<I', self._map, offset + CHECKPOINT_SLOT.size)
+        if zlib.crc32(body) != crc:
+            return None
+        
+        (magic, version, state, character, seq, sessions_completed, duration,
+         elapsed, paused_time, wall_time, monotonic, boot_id) = CHECKPOINT_SLOT.unpack(body)
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            return None
+        if state >= len(TIMER_STATE_CODES) or character >= len(CHARACTER_STATE_CODES):
+            return None
+        return {
+            'seq': seq,
+            'timer_state': TIMER_STATE_CODES[state],
+            'character_state': CHARACTER_STATE_CODES[character],
+            'sessions_completed': sessions_completed,
+            'timer_duration': duration,
+            'elapsed': elapsed,
+            'paused_time': paused_time,
+            'wall_time': wall_time,
+            'monotonic': monotonic,
+            'boot_id': boot_id
+        }
+    
+    def load(self):
+        """Get the newest valid record, or None"""
+        records = [record for record in (self._read_slot(0), self._read_slot(1)) if record]
+        if not records:
+            return None
+        record = max(records, key=lambda r: r['seq'])
+        self.seq = record['seq']
+        return record
+    
+    def offline_seconds(self, record):
+        """Estimate how long the app was not running since the record was written"""
+        if record['boot_id'] == self.boot_id and any(self.boot_id):
+            # Same boot: the monotonic clock is exact
+            return max(0.0, self.time_source.monotonic() - record['monotonic'])
+        
+        # After a reboot only the wall clock is left; without an RTC it can be
+        # behind the saved time until NTP syncs, which counts as no time passing
+        return max(0.0, self.time_source.time() - record['wall_time'])
+    
+    def save(self, timer_state, character_state, sessions_completed, timer_duration,
+             elapsed, paused_time, sync=False):
+        """Write the timer into the older slot"""
+        self.seq += 1
+        now = self.time_source.monotonic()
+        body = CHECKPOINT_SLOT.pack(
+            CHECKPOINT_MAGIC, CHECKPOINT_VERSION,
+            TIMER_STATE_CODES.index(timer_state), CHARACTER_STATE_CODES.index(character_state),
+            self.seq, sessions_completed, timer_duration, elapsed, paused_time,
+            self.time_source.time(), now, self.boot_id)
+        offset = (self.seq % 2) * CHECKPOINT_SLOT_SIZE
+        self._map[offset:offset + CHECKPOINT_SLOT.size] = body
+        struct.pack_into('<I', self._map, offset + CHECKPOINT_SLOT.size, zlib.crc32(body))
+        self.last_save = now
+        
+        # Dirty pages reach storage on their own eventually; msync is left to
+        # the writer thread so the main loop never waits on the SD card
+        if sync or self.last_sync is None or now - self.last_sync >= CHECKPOINT_SYNC_SECONDS:
+            self.last_sync = now
+            self.writer.call(self.sync)
+    
+    def sync(self):
+        """Force the mapped record to storage"""
+        if not self._map.closed:
+            self._map.flush()
+    
+    def close(self):
+        self.sync()
+        self._map.close()
+
+class AssetManager:
+    """Preloads sprites and hands out shared fonts so the frame loop does no I/O
+    
+    Every assets/characters/kim_dokja_<state>.png is loaded once, converted to
+    the display pixel format and pre-scaled for each size in use. Lookups for
+    missing sprites are remembered, so the fallback drawing is used without
+    touching the filesystem again. Scaled sprites can be evicted under
+    memory pressure and are rescaled from the source on the next lookup.
+    """
+    
+    def __init__(self, asset_dir=None, memory=None):
+        self.asset_dir = asset_dir or next((d for d in ASSET_DIRS if os.path.isdir(d)), ASSET_DIRS[-1])
+        self.memory = memory or MemoryAccountant()
+        self.memory.register('sprites', self.evict)
+        self._fonts = {}
+        self._sources = {}
+        self._sprites = {}
+        self.source_signature = "none"
+    
+    def font(self, size):
+        """Get the shared default font for a size"""
+        font = self._fonts.get(size)
+        if font is None:
+            try:
+                font = pygame.font.Font(None, size)
+            except Exception:
+                font = pygame.font.SysFont('arial', size)
+            self._fonts[size] = font
+        return font
+    
+    def preload_sprites(self, sizes=CHARACTER_SPRITE_SIZES):
+        """Load, convert and pre-scale every character state sprite"""
+        pattern = os.path.join(self.asset_dir, 'characters', 'kim_dokja_*.png')
+        paths = sorted(glob.glob(pattern))
+        
+        # Identifies this set of sprite files for the baked animation disk cache
+        fingerprint = ";".join(f"{os.path.basename(p)}:{os.path.getmtime(p)}:{os.path.getsize(p)}" for p in paths)
+        self.source_signature = f"{zlib.crc32(fingerprint.encode()):08x}"
+        
+        for path in paths:
+            state = os.path.basename(path)[len('kim_dokja_'):-len('.png')]
+            try:
+                self._sources[state] = pygame.image.load(path).convert_alpha()
+            except (pygame.error, FileNotFoundError) as e:
+                print(f"Could not load sprite {path}: {e}")
+                continue
+            # Sources are needed to rescale evicted sprites, so they always stay
+            self.memory.add('sprites', state, surface_bytes(self._sources[state]), pinned=True)
+        
+        for state in KimDokjaState:
+            for size in sizes:
+                self.character_sprite(state.value, size)
+        print(f"Preloaded {len(self._sources)} character sprites")
+    
+    def character_sprite(self, state, size):
+        """Get the sprite for a state at a size, falling back to idle, or None"""
+        key = (state, size)
+        if key in self._sprites:
+            self.memory.touch('sprites', key)
+            return self._sprites[key]
+        
+        source = self._sources.get(state)
+        if source is not None:
+            sprite = pygame.transform.scale(source, (size, size))
+            self.memory.add('sprites', key, surface_bytes(sprite))
+        elif state != 'idle':
+            sprite = self.character_sprite('idle', size)
+        else:
+            sprite = None
+        
+        # Missing sprites are cached as None so they are never looked up again
+        self._sprites[key] = sprite
+        return sprite
+    
+    def evict(self, key):
+        """Drop a scaled sprite"""
+        self._sprites.pop(key, None)
+
+class AnimationBaker:
+    """Bakes periodic character animations into frame strips
+    
+    Each (state, size, sprite/procedural) sequence is drawn once into a single
+    strip surface and played back with plain blits. Strips are optionally
+    saved as PNGs in cache_dir and reloaded on the next start. Sequences are
+    evicted least-recently-used first to stay within budget_bytes, and a
+    sequence that would not fit on its own is left to live drawing.
+    """
+    
+    def __init__(self, draw_frame, cycle_length, cache_dir=None,
+                 budget_bytes=ANIMATION_CACHE_KB * 1024, source_signature="none", enabled=True,
+                 writer=None, memory=None):
+        self.draw_frame = draw_frame
+        self.writer = writer or SyncWriter()
+        self.memory = memory or MemoryAccountant()
+        self.memory.register('animations', self.evict)
+        self.cycle_length = cycle_length
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_bytes
+        self.source_signature = source_signature
+        self.enabled = enabled
+        
+        self._sequences = OrderedDict()
+        self._too_large = set()
+        self.used_bytes = 0
+        self.baked = 0
+        self.loaded = 0
+    
+    def _cache_path(self, state, size, has_sprite):
+        kind = "sprite" if has_sprite else "drawn"
+        name = f"{state.value}_{size}_{kind}_v{ANIMATION_BAKE_VERSION}_{self.source_signature}.png"
+        return os.path.join(self.cache_dir, name)
+    
+    def _bake(self, state, size, has_sprite, count, width, height):
+        """Draw every frame of a cycle into one strip"""
+        strip = pygame.Surface((width * count, height), pygame.SRCALPHA)
+        for frame in range(count):
+            center_x = frame * width + width // 2
+            strip.set_clip((frame * width, 0, width, height))
+            self.draw_frame(strip, state, center_x, height // 2, size, frame, has_sprite)
+        strip.set_clip(None)
+        self.baked += 1
+        return strip
+    
+    def _load_strip(self, path, width, height):
+        """Load a previously baked strip from disk, or None"""
+        try:
+            strip = pygame.image.load(path).convert_alpha()
+        except (pygame.error, FileNotFoundError):
+            return None
+        if strip.get_size() != (width, height):
+            return None
+        self.loaded += 1
+        return strip
+    
+    def _save_strip(self, path, strip):
+        # The writer thread saves its own copy, so the strip is never shared across threads
+        pixels = pygame.image.tostring(strip, 'RGBA')
+        self.writer.call(self._write_png, path, pixels, strip.get_size())
+    
+    def _write_png(self, path, pixels, size):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(pygame.image.fromstring(pixels, size, 'RGBA'), path)
+        except (pygame.error, OSError) as e:
+            print(f"Could not cache animation {path}: {e}")
+    
+    def frames(self, state, size, has_sprite):
+        """Get the baked frame list for a state, or None to draw live"""
+        key = (state, size, has_sprite)
+        sequence = self._sequences.get(key)
+        if sequence is not None:
+            self._sequences.move_to_end(key)
+            self.memory.touch('animations', key)
+            return sequence[1]
+        if key in self._too_large:
+            return None
+        
+        count = self.cycle_length(state, has_sprite)
+        width = size + CHARACTER_BOX_PADDING[0]
+        height = size + CHARACTER_BOX_PADDING[1]
+        nbytes = width * height * 4 * count
+        if nbytes > self.budget_bytes:
+            self._too_large.add(key)
+            return None
+        
+        strip = None
+        path = None
+        if self.cache_dir:
+            path = self._cache_path(state, size, has_sprite)
+            strip = self._load_strip(path, width * count, height)
+        if strip is None:
+            strip = self._bake(state, size, has_sprite, count, width, height)
+            if path:
+                self._save_strip(path, strip)
+        
+        frames = [strip.subsurface((i * width, 0, width, height)) for i in range(count)]
+        self._sequences[key] = (strip, frames, nbytes)
+        self.used_bytes += nbytes
+        self.memory.add('animations', key, nbytes)
+        
+        while self.used_bytes > self.budget_bytes and len(self._sequences) > 1:
+            evicted, (_, _, evicted_bytes) = self._sequences.popitem(last=False)
+            self.used_bytes -= evicted_bytes
+            self.memory.remove('animations', evicted)
+        return frames
+    
+    def evict(self, key):
+        """Drop one baked sequence; it is baked or loaded again when next shown"""
+        sequence = self._sequences.pop(key, None)
+        if sequence is not None:
+            self.used_bytes -= sequence[2]
+    
+    def clear(self):
+        """Drop every baked sequence"""
+        for key in self._sequences:
+            self.memory.remove('animations', key)
+        self._sequences.clear()
+        self.used_bytes = 0
+
+class InputBridge:
+    """Turns button edges from any thread into timestamped pygame events
+    
+    GPIO callbacks (or the desktop simulator) call edge(); the main loop
+    handles the resulting BUTTON_EVENT, so every state change happens on the
+    main thread. The time from edge to the next presented frame is recorded
+    as input-to-photon latency.
+    """
+    
+    def __init__(self, debounce=BUTTON_DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._last_edge = -debounce
+        self._lock = threading.Lock()
+        self._overflow = deque()
+        self._awaiting_frame = []
+        self.latencies_ms = deque(maxlen=INPUT_LATENCY_SAMPLES)
+        self.presses = 0
+        self.bounces = 0
+    
+    def edge(self, source="gpio"):
+        """Report a button edge from any thread, returns False if it was a bounce"""
+        now = time.perf_counter()
+        with self._lock:
+            if now - self._last_edge < self.debounce:
+                self.bounces += 1
+                return False
+            self._last_edge = now
+        
+        event = pygame.event.Event(BUTTON_EVENT, source=source, timestamp=now)
+        try:
+            posted = pygame.event.post(event)
+        except pygame.error:
+            posted = False
+        if posted is False:
+            # Queue full or video not ready, the main loop drains this on its next pass
+            self._overflow.append(event)
+        return True
+    
+    def drain(self):
+        """Get button events that could not be posted to the pygame queue"""
+        events = []
+        while self._overflow:
+            events.append(self._overflow.popleft())
+        return events
+    
+    def handled(self, event):
+        """Note that the main loop has acted on a button event"""
+        self.presses += 1
+        self._awaiting_frame.append(event.timestamp)
+    
+    def frame_presented(self):
+        """Record latency for every press whose result is now on screen"""
+        if self._awaiting_frame:
+            now = time.perf_counter()
+            for timestamp in self._awaiting_frame:
+                self.latencies_ms.append((now - timestamp) * 1000)
+            self._awaiting_frame.clear()
+    
+    def stats(self):
+        """Get press counts and input-to-photon latency"""
+        latencies = sorted(self.latencies_ms)
+        return {
+            'presses': self.presses,
+            'bounces': self.bounces,
+            'latency_p50_ms': round(latencies[len(latencies) // 2], 2) if latencies else None,
+            'latency_max_ms': round(latencies[-1], 2) if latencies else None
+        }
+
+class SimulatedGPIO:
+    """Desktop stand-in for the power button interrupt
+    
+    press() invokes the registered callback on a separate thread, like
+    RPi.GPIO's callback thread, so the desktop goes through the same input
+    bridge as the hardware.
+    """
+    
+    def __init__(self, channel=3):  # same BCM pin as POWER_BUTTON_PIN
+        self.channel = channel
+        self.callback = None
+    
+    def add_event_detect(self, callback):
+        self.callback = callback
+    
+    def press(self):
+        """Simulate a falling edge on the button pin"""
+        if self.callback:
+            threading.Thread(target=self.callback, args=(self.channel,), daemon=True).start()
+
+class StartupTimeline:
+    """Records how long each startup phase takes, relative to process start"""
+    
+    def __init__(self, origin=STARTUP_T0):
+        self.origin = origin
+        self.phases = []
+        self.marks = {}
+    
+    def _now_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+    
+    def add(self, name, start_ms, end_ms):
+        self.phases.append({'phase': name, 'start_ms': round(start_ms, 2),
+                            'duration_ms': round(end_ms - start_ms, 2)})
+    
+    def phase(self, name):
+        """Context manager timing one phase"""
+        timeline = self
+        
+        class _Phase:
+            def __enter__(self):
+                self.start = timeline._now_ms()
+            
+            def __exit__(self, *exc):
+                timeline.add(name, self.start, timeline._now_ms())
+                return False
+        
+        return _Phase()
+    
+    def mark(self, name):
+        """Record a point in time, such as the first frame being shown"""
+        self.marks[name] = round(self._now_ms(), 2)
+    
+    def to_dict(self):
+        return {'phases': self.phases, 'marks': self.marks}
+    
+    def dump(self, path):
+        """Write the timeline as JSON"""
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+        except OSError as e:
+            print(f"Could not write startup trace: {e}")
+
+class FrameProfiler:
+    """Ring buffer of per-phase frame timings
+    
+    Each frame is stored as len(PROFILE_PHASES) + 1 perf_counter timestamps
+    (the boundaries between phases) plus the process CPU time used, in a
+    flat array of doubles, so recording allocates nothing. The main loop only
+    calls into the profiler while it is enabled.
+    """
+    
+    STRIDE = len(PROFILE_PHASES) + 2
+    
+    def __init__(self, frames=PROFILE_FRAMES, enabled=False):
+        self.frames = frames
+        self.enabled = enabled
+        self.count = 0
+        self._data = array('d', bytes(8 * frames * self.STRIDE))
+    
+    def record(self, boundaries, cpu_seconds):
+        """Store one frame; boundaries holds the start of each phase and the end of the last"""
+        data = self._data
+        offset = (self.count % self.frames) * self.STRIDE
+        for value in boundaries:
+            data[offset] = value
+            offset += 1
+        data[offset] = cpu_seconds
+        self.count += 1
+    
+    def recent(self):
+        """Get the buffered frames, oldest first, as array slices"""
+        stored = min(self.count, self.frames)
+        first = self.count - stored
+        frames = []
+        for i in range(first, self.count):
+            offset = (i % self.frames) * self.STRIDE
+            frames.append(self._data[offset:offset + self.STRIDE])
+        return frames
+    
+    def clear(self):
+        self.count = 0
+    
+    def summary(self):
+        """Get FPS, worst busy frame, CPU share and average ms per phase"""
+        frames = self.recent()
+        if not frames:
+            return None
+        
+        wait_index = PROFILE_PHASES.index('wait')
+        phase_ms = [0.0] * len(PROFILE_PHASES)
+        worst_ms = 0.0
+        cpu_seconds = 0.0
+        for frame in frames:
+            busy_ms = 0.0
+            for i in range(len(PROFILE_PHASES)):
+                ms = (frame[i + 1] - frame[i]) * 1000
+                phase_ms[i] += ms
+                if i != wait_index:
+                    busy_ms += ms
+            worst_ms = max(worst_ms, busy_ms)
+            cpu_seconds += frame[-1]
+        
+        span = frames[-1][len(PROFILE_PHASES)] - frames[0][0]
+        return {
+            'frames': len(frames),
+            'fps': len(frames) / span if span > 0 else 0.0,
+            'worst_ms': worst_ms,
+            'cpu_percent': 100 * cpu_seconds / span if span > 0 else 0.0,
+            'phase_ms': {name: total / len(frames) for name, total in zip(PROFILE_PHASES, phase_ms)}
+        }
+    
+    def trace(self):
+        """Get the buffered frames in Chrome trace format (also loads in speedscope), or None"""
+        frames = self.recent()
+        if not frames:
+            return None
+        
+        origin = frames[0][0]
+        events = []
+        for number, frame in enumerate(frames):
+            start = frame[0]
+            end = frame[len(PROFILE_PHASES)]
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': round((start - origin) * 1e6, 1),
+                           'dur': round((end - start) * 1e6, 1),
+                           'args': {'frame': self.count - len(frames) + number,
+                                    'cpu_ms': round(frame[-1] * 1000, 3)}})
+            for i, name in enumerate(PROFILE_PHASES):
+                events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': round((frame[i] - origin) * 1e6, 1),
+                               'dur': round((frame[i + 1] - frame[i]) * 1e6, 1)})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def chime_patterns(frequency, duration):
+    """Scale TONE_PATTERNS to a base frequency in Hz and a chime length in seconds"""
+    return {name: [(int(round(frequency * step_frequency)), duration * step_duration, duration * gap)
+                   for step_frequency, step_duration, gap in steps]
+            for name, steps in TONE_PATTERNS.items()}
+
+class PWMBuzzerBackend:
+    """Drives the hardware buzzer through a single long-lived PWM channel"""
+    
+    def __init__(self):
+        load_gpio()
+        self.pwm = GPIO.PWM(BUZZER_PIN, 1000)
+    
+    def play(self, frequency, duration, volume, interrupt):
+        self.pwm.ChangeFrequency(frequency)
+        # A piezo gets louder towards 50% duty cycle
+        self.pwm.start(max(1, 50 * volume))
+        interrupt.wait(duration)
+        self.pwm.stop()
+    
+    def close(self):
+        self.pwm.stop()
+
+class MixerBackend:
+    """Plays cached synthesized tones through the pygame mixer"""
+    
+    def __init__(self, tone_engine):
+        self.tone_engine = tone_engine
+    
+    def play(self, frequency, duration, volume, interrupt):
+        try:
+            sound = self.tone_engine.tone(frequency, duration, volume)
+        except Exception:
+            print(f"BEEP! ({frequency}Hz for {duration}s)")
+            interrupt.wait(duration)
+            return
+        sound.play()
+        if interrupt.wait(duration):
+            sound.stop()
+    
+    def close(self):
+        pass
+
+class FakePWMBackend:
+    """Records what the buzzer would have played, for tests on any machine"""
+    
+    def __init__(self, real_time=False):
+        self.real_time = real_time
+        self.played = []
+    
+    def play(self, frequency, duration, volume, interrupt):
+        self.played.append((frequency, duration, volume))
+        if self.real_time:
+            interrupt.wait(duration)
+    
+    def close(self):
+        pass
+
+class AudioWorker:
+    """Long-lived thread that owns the buzzer and plays queued tone patterns
+    
+    submit() never blocks. When a pattern arrives while another is playing
+    or queued, the overlap policy decides what happens: "coalesce" skips a
+    pattern identical to one already pending, "drop" ignores anything new
+    while busy, and "replace" cuts the current pattern short.
+    """
+    
+    def __init__(self, backend, policy=AUDIO_OVERLAP_POLICY, volume=0.5, max_queue=AUDIO_QUEUE_SIZE):
+        self.backend = backend
+        self.policy = policy
+        self.volume = volume
+        self.max_queue = max_queue
+        
+        self._queue = deque()
+        self._current = None
+        self._condition = threading.Condition()
+        self._interrupt = threading.Event()
+        self._closed = False
+        
+        self.played = 0
+        self.dropped = 0
+        self.coalesced = 0
+        
+        self._thread = threading.Thread(target=self._run, name="audio-worker", daemon=True)
+        self._thread.start()
+    
+    def submit(self, steps):
+        """Queue a pattern of (frequency, duration, gap) steps, returns False if it was not queued"""
+        steps = tuple(tuple(step) for step in steps)
+        with self._condition:
+            busy = self._current is not None or bool(self._queue)
+            if self.policy == "drop" and busy:
+                self.dropped += 1
+                return False
+            if self.policy == "coalesce" and (steps == self._current or steps in self._queue):
+                self.coalesced += 1
+                return False
+            if self.policy == "replace":
+                self._queue.clear()
+                if self._current is not None:
+                    self._interrupt.set()
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return False
+            
+            self._queue.append(steps)
+            self._condition.notify()
+        return True
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                steps = self._queue.popleft()
+                self._current = steps
+                self._interrupt.clear()
+            
+            for frequency, duration, gap in steps:
+                if self._interrupt.is_set():
+                    break
+                try:
+                    self.backend.play(frequency, duration, self.volume, self._interrupt)
+                except Exception as e:
+                    print(f"Audio error: {e}")
+                    break
+                if gap and self._interrupt.wait(gap):
+                    break
+            
+            with self._condition:
+                self._current = None
+                self.played += 1
+                self._condition.notify_all()
+    
+    def idle(self, timeout=None):
+        """Wait until nothing is playing or queued, returns False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._current is None and not self._queue, timeout)
+    
+    def close(self):
+        """Stop playback and shut the worker down"""
+        with self._condition:
+            self._closed = True
+            self._queue.clear()
+            self._interrupt.set()
+            self._condition.notify_all()
+        self._thread.join(timeout=1.0)
+        self.backend.close()
+    
+    def stats(self):
+        with self._condition:
+            return {
+                'queued': len(self._queue),
+                'played': self.played,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced
+            }
+
+class ScheduledTimer:
+    """A named timer running through (label, seconds) steps for a number of rounds"""
+    
+    def __init__(self, name, steps, rounds=1, on_step=None):
+        self.name = name
+        self.steps = [(label, float(seconds)) for label, seconds in steps]
+        self.rounds = rounds  # None repeats until cancelled
+        self.on_step = on_step
+        self.step = 0
+        self.round = 0
+        self.deadline = None
+        self.remaining = None  # seconds left while paused
+        self.generation = 0
+    
+    @property
+    def paused(self):
+        return self.remaining is not None
+    
+    @property
+    def label(self):
+        return self.steps[self.step][0]
+    
+    @property
+    def duration(self):
+        return self.steps[self.step][1]
+    
+    def remaining_at(self, now):
+        if self.paused:
+            return self.remaining
+        return max(0.0, self.deadline - now)
+    
+    def elapsed_at(self, now):
+        return self.duration - self.remaining_at(now)
+
+class TimerScheduler:
+    """Any number of named timers in a min-heap keyed on monotonic deadlines
+    
+    The next expiry is the top of the heap; adding a timer is a heap push.
+    Cancelling or pausing one bumps its generation instead of searching the
+    heap, so its old entry is skipped when it surfaces (lazy deletion), and
+    the heap is compacted once such stale entries outnumber the live ones.
+    Steps are chained from the previous deadline, so interval timers do not
+    drift and catch up correctly after the loop has been stalled.
+    """
+    
+    def __init__(self, time_source):
+        self.time_source = time_source
+        self.timers = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._stale = 0
+    
+    def _push(self, timer):
+        timer.generation += 1
+        heapq.heappush(self._heap, (timer.deadline, next(self._counter), timer, timer.generation))
+    
+    def _retire(self, timer):
+        """Invalidate the heap entry of a running timer"""
+        if not timer.paused:
+            timer.generation += 1
+            self._stale += 1
+    
+    def add(self, name, steps, rounds=1, on_step=None, elapsed=0.0, paused=False):
+        """Start a timer (replacing one with the same name), elapsed seconds into its first step"""
+        self.cancel(name)
+        timer = ScheduledTimer(name, steps, rounds, on_step)
+        if paused:
+            timer.remaining = max(0.0, timer.duration - elapsed)
+        else:
+            timer.deadline = self.time_source.monotonic() + timer.duration - elapsed
+            self._push(timer)
+        self.timers[name] = timer
+        return timer
+    
+    def get(self, name):
+        return self.timers.get(name)
+    
+    def cancel(self, name):
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            self._retire(timer)
+        return timer
+    
+    def pause(self, name):
+        timer = self.timers.get(name)
+        if timer is not None and not timer.paused:
+            remaining = timer.remaining_at(self.time_source.monotonic())
+            self._retire(timer)
+            timer.remaining = remaining
+    
+    def resume(self, name):
+        timer = self.timers.get(name)
+        if timer is not None and timer.paused:
+            timer.deadline = self.time_source.monotonic() + timer.remaining
+            timer.remaining = None
+            self._push(timer)
+    
+    def _is_stale(self, entry):
+        _, _, timer, generation = entry
+        return generation != timer.generation or self.timers.get(timer.name) is not timer
+    
+    def _prune(self):
+        """Drop stale entries from the top of the heap, compacting it if they pile up"""
+        if self._stale > len(self.timers) + TIMER_HEAP_SLACK:
+            self._heap = [entry for entry in self._heap if not self._is_stale(entry)]
+            heapq.heapify(self._heap)
+            self._stale = 0
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+            self._stale -= 1
+    
+    def next_deadline(self):
+        """Monotonic time of the next expiry, or None if nothing is running"""
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+    
+    def poll(self):
+        """Advance every timer whose step has ended, calling its on_step(timer, label, done)"""
+        now = self.time_source.monotonic()
+        while True:
+            self._prune()
+            if not self._heap or self._heap[0][0] > now:
+                return
+            _, _, timer, _ = heapq.heappop(self._heap)
+            
+            finished = timer.label
+            timer.step += 1
+            if timer.step == len(timer.steps):
+                timer.step = 0
+                timer.round += 1
+            done = timer.rounds is not None and timer.round >= timer.rounds
+            if done:
+                del self.timers[timer.name]
+            else:
+                timer.deadline += timer.duration
+                self._push(timer)
+            
+            # Callbacks may add, pause or cancel timers, including this one
+            if timer.on_step is not None:
+                timer.on_step(timer, finished, done)
+
+class SystemClock:
+    """Wall-clock and animation tick source used by the app"""
+    
+    def time(self):
+        return time.time()
+    
+    def monotonic(self):
+        return time.monotonic()
+    
+    def ticks(self):
+        return pygame.time.get_ticks()
+
+class ManualClock:
+    """Clock that only moves when advanced, for benchmarks and simulations"""
+    
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.now = self.start
+    
+    def advance(self, seconds):
+        self.now += seconds
+    
+    def time(self):
+        return self.now
+    
+    def monotonic(self):
+        return self.now
+    
+    def ticks(self):
+        return int((self.now - self.start) * 1000)
+
+class MemoryAccountant:
+    """Tracks the bytes held by in-memory caches and keeps them within one budget
+    
+    Each cache registers an evict callback, reports every entry it keeps with
+    add() and every hit with touch(). All entries share a single LRU order,
+    so when the total goes over budget_bytes the least recently used entry
+    of any cache is dropped first. Pinned entries are counted but never
+    evicted, and neither is anything used since the previous enforce() call,
+    so a budget smaller than one frame's working set degrades to caching
+    just what is on screen rather than redrawing it every frame. The audio
+    worker fills the sound cache from its own thread, so the bookkeeping is
+    locked and eviction only happens in enforce(), which the main loop calls
+    between frames.
+    
+    Surface and sound pixels live in SDL's heap where tracemalloc cannot see
+    them, which is why sizes are reported by the caches rather than traced.
+    """
+    
+    def __init__(self, budget_bytes=None):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._evictors = {}
+        self.used = {}
+        self.counts = {}
+        self.evictions = {}
+        self.total = 0
+        self.peak = 0
+        self.frame = 0
+        self._baseline = None
+    
+    def register(self, cache, evict):
+        """Add a cache; evict(key) must drop that entry from it"""
+        self._evictors[cache] = evict
+        self.used.setdefault(cache, 0)
+        self.counts.setdefault(cache, 0)
+        self.evictions.setdefault(cache, 0)
+    
+    def add(self, cache, key, nbytes, pinned=False):
+        """Account for a new or resized entry as the most recently used"""
+        entry = (cache, key)
+        with self._lock:
+            self._forget(entry)
+            if pinned:
+                self._pinned[entry] = nbytes
+            else:
+                self._entries[entry] = (nbytes, self.frame)
+            self.used[cache] += nbytes
+            self.counts[cache] += 1
+            self.total += nbytes
+            self.peak = max(self.peak, self.total)
+    
+    def touch(self, cache, key):
+        """Mark an entry as just used"""
+        entry = (cache, key)
+        with self._lock:
+            used = self._entries.get(entry)
+            if used is not None:
+                self._entries[entry] = (used[0], self.frame)
+                self._entries.move_to_end(entry)
+    
+    def remove(self, cache, key):
+        """Stop accounting for an entry the cache dropped by itself"""
+        with self._lock:
+            self._forget((cache, key))
+    
+    def _forget(self, entry):
+        if entry in self._entries:
+            nbytes = self._entries.pop(entry)[0]
+        elif entry in self._pinned:
+            nbytes = self._pinned.pop(entry)
+        else:
+            return
+        self.used[entry[0]] -= nbytes
+        self.counts[entry[0]] -= 1
+        self.total -= nbytes
+    
+    def enforce(self):
+        """Evict least recently used entries until the total fits the budget, returns bytes freed"""
+        frame = self.frame
+        self.frame += 1
+        if self.budget_bytes is None or self.total <= self.budget_bytes:
+            return 0
+        freed = 0
+        while self.total > self.budget_bytes:
+            with self._lock:
+                if not self._entries:
+                    break
+                entry, (nbytes, used) = next(iter(self._entries.items()))
+                if used == frame:
+                    break
+                del self._entries[entry]
+                cache, key = entry
+                self.used[cache] -= nbytes
+                self.counts[cache] -= 1
+                self.evictions[cache] += 1
+                self.total -= nbytes
+            self._evictors[cache](key)
+            freed += nbytes
+        return freed
+    
+    def start_tracing(self, frames=MEMORY_TRACE_FRAMES):
+        """Record Python allocations with tracemalloc for later dumps"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+    
+    def mark_baseline(self):
+        """Remember the current allocations, so dumps can show what grew since"""
+        if tracemalloc.is_tracing():
+            self._baseline = tracemalloc.take_snapshot()
+    
+    def stats(self):
+        """Get RSS and per-cache usage"""
+        rss = read_rss()
+        return {
+            'rss_kb': None if rss is None else rss // 1024,
+            'budget_kb': None if self.budget_bytes is None else self.budget_bytes // 1024,
+            'used_kb': round(self.total / 1024, 1),
+            'peak_kb': round(self.peak / 1024, 1),
+            'caches': {cache: {'kb': round(self.used[cache] / 1024, 1),
+                               'entries': self.counts[cache],
+                               'evictions': self.evictions[cache]}
+                       for cache in self._evictors}
+        }
+    
+    def report(self, top=MEMORY_DUMP_TOP):
+        """Get stats() plus, while tracing, the largest and fastest growing allocation sites"""
+        report = self.stats()
+        if not tracemalloc.is_tracing():
+            return report
+        
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        report['traced_kb'] = round(traced / 1024, 1)
+        report['traced_peak_kb'] = round(traced_peak / 1024, 1)
+        report['top_allocations'] = [
+            {'where': str(stat.traceback), 'kb': round(stat.size / 1024, 1), 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:top]]
+        if self._baseline is not None:
+            report['growth'] = [
+                {'where': str(stat.traceback), 'kb': round(stat.size_diff / 1024, 1),
+                 'count': stat.count_diff}
+                for stat in snapshot.compare_to(self._baseline, 'lineno')[:top] if stat.size_diff]
+        return report
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces"""
+    
+    def __init__(self, max_entries=TEXT_CACHE_SIZE, memory=None):
+        self.max_entries = max_entries
+        self.memory = memory or MemoryAccountant()
+        self.memory.register('text', self.evict)
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def render(self, font, text, color, antialias=True):
+        """Return a rendered surface, rasterizing the glyphs only on a cache miss"""
+        key = (font, text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.memory.touch('text', key)
+            self.hits += 1
+            return surface
+        
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        self.memory.add('text', key, surface_bytes(surface))
+        if len(self._surfaces) > self.max_entries:
+            evicted, _ = self._surfaces.popitem(last=False)
+            self.memory.remove('text', evicted)
+            self.evictions += 1
+        return surface
+    
+    def evict(self, key):
+        """Drop one cached surface"""
+        if self._surfaces.pop(key, None) is not None:
+            self.evictions += 1
+    
+    def clear(self):
+        """Drop every cached surface"""
+        for key in self._surfaces:
+            self.memory.remove('text', key)
+        self._surfaces.clear()
+    
+    def stats(self):
+        """Get cache counters"""
+        return {
+            'entries': len(self._surfaces),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class RGB565Output:
+    """Writes changed rectangles of the screen as RGB565 to a framebuffer, file or memory
+    
+    The target is memory-mapped (or a bytearray for "memory") and viewed as
+    a uint16 array, so converted pixels land directly in it. Conversion reads
+    the surface through surfarray.pixels3d, which references the pixels
+    instead of copying them, and works in two preallocated scratch buffers.
+    """
+    
+    def __init__(self, spec, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT, bgr=False):
+        if np is None:
+            raise RuntimeError("RGB565 output needs NumPy")
+        
+        self.spec = spec
+        self.width = width
+        self.height = height
+        self.bgr = bgr
+        self.frames = 0
+        self.pixels_written = 0
+        self._map = None
+        
+        kind, _, target = spec.partition(':')
+        stride = width * 2
+        if kind == 'memory':
+            self.buffer = bytearray(stride * height)
+        elif kind in ('fb', 'file'):
+            if kind == 'fb':
+                stride = self._framebuffer_stride(target, stride)
+            size = stride * height
+            flags = os.O_RDWR | (os.O_CREAT if kind == 'file' else 0)
+            fd = os.open(target, flags, 0o644)
+            try:
+                if kind == 'file' and os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._map = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            self.buffer = self._map
+        else:
+            raise ValueError(f"Unknown display output '{spec}'")
+        
+        self.pixels = np.ndarray((height, stride // 2), dtype='<u2', buffer=self.buffer)[:, :width]
+        self._scratch = np.empty((2, height, width), dtype=np.uint16)
+    
+    @staticmethod
+    def _framebuffer_stride(device, default):
+        """Check a framebuffer is 16 bpp and get its line length in bytes"""
+        sys_dir = os.path.join('/sys/class/graphics', os.path.basename(device))
+        try:
+            with open(os.path.join(sys_dir, 'bits_per_pixel'), 'r') as f:
+                bpp = int(f.read())
+            if bpp != 16:
+                raise ValueError(f"{device} is {bpp} bpp, RGB565 output needs 16")
+            with open(os.path.join(sys_dir, 'stride'), 'r') as f:
+                return int(f.read())
+        except OSError:
+            return default
+    
+    def write(self, surface, dirty_rects):
+        """Convert and write the given rects (None means the whole surface)"""
+        bounds = pygame.Rect(0, 0, self.width, self.height)
+        if dirty_rects is None:
+            rects = [bounds]
+        else:
+            rects = [bounds.clip(rect) for rect in dirty_rects]
+        
+        # pixels3d locks the surface, so the view must be dropped before drawing resumes
+        source = pygame.surfarray.pixels3d(surface)
+        try:
+            for rect in rects:
+                if rect.width and rect.height:
+                    self._convert(source, rect)
+        finally:
+            del source
+        self.frames += 1
+    
+    def _convert(self, source, rect):
+        x, y, w, h = rect
+        region = source[x:x + w, y:y + h]  # (w, h, 3), transposed below without copying
+        red = region[:, :, 2 if self.bgr else 0].T
+        green = region[:, :, 1].T
+        blue = region[:, :, 0 if self.bgr else 2].T
+        high = self._scratch[0, :h, :w]
+        low = self._scratch[1, :h, :w]
+        
+        np.left_shift(red, 8, out=high, dtype=np.uint16)
+        np.bitwise_and(high, 0xF800, out=high)
+        np.left_shift(green, 3, out=low, dtype=np.uint16)
+        np.bitwise_and(low, 0x07E0, out=low)
+        np.bitwise_or(high, low, out=high)
+        np.right_shift(blue, 3, out=low, dtype=np.uint16)
+        np.bitwise_or(high, low, out=self.pixels[y:y + h, x:x + w])
+        self.pixels_written += w * h
+    
+    def stats(self):
+        return {'target': self.spec, 'frames': self.frames, 'pixels_written': self.pixels_written}
+    
+    def close(self):
+        self.pixels = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
 
-class TimerState(Enum):
-    IDLE = "idle"
-    WORKING = "working"
-    SHORT_BREAK = "short_break"
-    LONG_BREAK = "long_break"
-    PAUSED = "paused"
+class NotesListView:
+    """Virtualized, kinetically scrolling list of note rows
+    
+    Rows have a fixed height, so the visible range follows from the scroll
+    offset alone and drawing a frame touches only the rows on screen. Each
+    row is pre-rendered once (number plus wrapped text) into a surface from
+    a small pool; when a row scrolls into view, the least recently shown
+    surface is repainted for it instead of allocating a new one.
+    """
+    
+    def __init__(self, rect, font, max_lines=NOTE_ROW_MAX_LINES, memory=None):
+        self.rect = pygame.Rect(rect)
+        self.font = font
+        self.memory = memory or MemoryAccountant()
+        self.memory.register('note_rows', self.evict)
+        self.max_lines = max_lines
+        self.line_height = font.get_linesize()
+        self.row_height = max_lines * self.line_height + NOTE_ROW_PADDING
+        self.pool_size = self.rect.height // self.row_height + 2
+        self._rows = OrderedDict()
+        
+        self.count = 0
+        self.offset = 0.0
+        self.velocity = 0.0
+        self.dragging = False
+        self._drag_start = (0, 0.0)
+        self._samples = deque(maxlen=6)
+        self._last_step = None
+        self.renders = 0
+    
+    @property
+    def max_offset(self):
+        return max(0, self.count * self.row_height - self.rect.height)
+    
+    @property
+    def moving(self):
+        return self.dragging or self.velocity != 0.0
+    
+    def set_count(self, count):
+        self.count = count
+        self.offset = min(self.offset, self.max_offset)
+    
+    def scroll_to_top(self):
+        self.offset = 0.0
+        self.velocity = 0.0
+    
+    def signature(self):
+        return (int(self.offset), self.count)
+    
+    def wrap(self, text):
+        """Split text into at most max_lines lines that fit the row width"""
+        width = self.rect.width - 16
+        lines = []
+        line = ""
+        for word in text.split():
+            candidate = f"{line} {word}" if line else word
+            if self.font.size(candidate)[0] <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # Words wider than a row are broken at the row width
+            while self.font.size(word)[0] > width:
+                cut = len(word) - 1
+                while cut > 1 and self.font.size(word[:cut])[0] > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        if line:
+            lines.append(line)
+        
+        if len(lines) > self.max_lines:
+            lines = lines[:self.max_lines]
+            last = lines[-1]
+            while last and self.font.size(last + "...")[0] > width:
+                last = last[:-1]
+            lines[-1] = last + "..."
+        return lines
+    
+    def row(self, note_id, text):
+        """Get the rendered row for a note, repainting a pooled surface if needed"""
+        surface = self._rows.get(note_id)
+        if surface is not None:
+            self._rows.move_to_end(note_id)
+            self.memory.touch('note_rows', note_id)
+            return surface
+        
+        if len(self._rows) >= self.pool_size:
+            recycled, surface = self._rows.popitem(last=False)
+            self.memory.remove('note_rows', recycled)
+        else:
+            surface = pygame.Surface((self.rect.width, self.row_height))
+        surface.fill(BLACK)
+        for i, line in enumerate(self.wrap(f"{note_id + 1}. {text or ''}")):
+            surface.blit(self.font.render(line, True, WHITE), (10 if i == 0 else 26, 2 + i * self.line_height))
+        pygame.draw.line(surface, DARK_GRAY, (10, self.row_height - 1), (self.rect.width - 10, self.row_height - 1))
+        self._rows[note_id] = surface
+        self.memory.add('note_rows', note_id, surface_bytes(surface))
+        self.renders += 1
+        return surface
+    
+    def evict(self, note_id):
+        """Drop a pooled row surface"""
+        self._rows.pop(note_id, None)
+    
+    def draw(self, screen, row_at):
+        """Blit the visible rows; row_at(index) gives (note_id, text), index 0 at the top"""
+        top = int(self.offset)
+        first = top // self.row_height
+        last = min(self.count, (top + self.rect.height) // self.row_height + 1)
+        for index in range(first, last):
+            note_id, text = row_at(index)
+            screen.blit(self.row(note_id, text),
+                        (self.rect.x, self.rect.y + index * self.row_height - top))
+    
+    def press(self, pos, now):
+        self.dragging = True
+        self.velocity = 0.0
+        self._drag_start = (pos[1], self.offset)
+        self._samples.clear()
+        self._samples.append((now, pos[1]))
+    
+    def move(self, pos, now):
+        start_y, start_offset = self._drag_start
+        self.offset = min(max(0.0, start_offset + start_y - pos[1]), self.max_offset)
+        self._samples.append((now, pos[1]))
+    
+    def release(self, now):
+        """End a drag, flinging with the speed of the last ~100 ms of movement"""
+        self.dragging = False
+        recent = [(t, y) for t, y in self._samples if now - t <= 0.1]
+        if len(recent) >= 2 and recent[-1][0] > recent[0][0]:
+            self.velocity = -(recent[-1][1] - recent[0][1]) / (recent[-1][0] - recent[0][0])
+            self._last_step = now
+            if abs(self.velocity) < NOTE_SCROLL_MIN_SPEED:
+                self.velocity = 0.0
+    
+    def fling(self, velocity, now):
+        self.velocity += velocity
+        self._last_step = now
+    
+    def step(self, now):
+        """Advance a fling; the speed decays exponentially and stops at either end"""
+        if self.dragging or self.velocity == 0.0:
+            return
+        dt = min(now - self._last_step, 0.1)
+        self._last_step = now
+        self.offset += self.velocity * dt
+        self.velocity *= math.exp(-NOTE_SCROLL_FRICTION * dt)
+        if self.offset <= 0.0 or self.offset >= self.max_offset:
+            self.offset = min(max(0.0, self.offset), self.max_offset)
+            self.velocity = 0.0
+        elif abs(self.velocity) < NOTE_SCROLL_MIN_SPEED:
+            self.velocity = 0.0
 
-class KimDokjaState(Enum):
-    IDLE = "idle"
-    WORKING = "working"
-    RESTING = "resting"
-    CELEBRATING = "celebrating"
+class ToneEngine:
+    """Synthesizes buzzer tones with NumPy and memoizes the resulting sounds
+    
+    Only the mixer sounds are kept; the waveform they were built from is
+    dropped right away, since the sound holds its own copy of the samples.
+    The chime steps are pinned, so they are never synthesized twice.
+    """
+    
+    def __init__(self, memory=None):
+        self.memory = memory or MemoryAccountant()
+        self.memory.register('sounds', self.evict)
+        self._sounds = {}
+    
+    def available(self):
+        """Check whether tones can be synthesized on this host"""
+        return np is not None and pygame.mixer.get_init() is not None
+    
+    def _wave(self, frequency, duration, volume):
+        """Synthesize a mono int16 waveform for a single tone"""
+        sample_rate = pygame.mixer.get_init()[0]
+        frames = int(duration * sample_rate)
+        t = np.arange(frames, dtype=np.float32) / sample_rate
+        wave = np.sin((2 * math.pi * frequency) * t)
+        
+        # Short linear fade on both ends avoids clicks
+        fade = min(int(TONE_FADE_SECONDS * sample_rate), frames // 2)
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            wave[:fade] *= ramp
+            wave[-fade:] *= ramp[::-1]
+        
+        return (wave * (TONE_MAX_AMPLITUDE * volume)).astype(np.int16)
+    
+    def _make_sound(self, wave):
+        """Build a mixer sound from a mono waveform"""
+        channels = pygame.mixer.get_init()[2]
+        if channels > 1:
+            wave = np.repeat(wave[:, np.newaxis], channels, axis=1)
+        return pygame.sndarray.make_sound(wave)
+    
+    def tone(self, frequency, duration, volume=0.5, pinned=False):
+        """Get a cached sound for a single tone"""
+        key = ('tone', frequency, duration, volume)
+        sound = self._sounds.get(key)
+        if sound is not None:
+            self.memory.touch('sounds', key)
+            return sound
+        
+        wave = self._wave(frequency, duration, volume)
+        sound = self._make_sound(wave)
+        self._sounds[key] = sound
+        self.memory.add('sounds', key, wave.nbytes * pygame.mixer.get_init()[2], pinned=pinned)
+        return sound
+    
+    def evict(self, key):
+        """Drop a cached sound"""
+        self._sounds.pop(key, None)
+    
+    def prewarm(self, patterns, volume=0.5):
+        """Synthesize every chime step ahead of time"""
+        if self.available():
+            for steps in patterns.values():
+                for frequency, duration, _ in steps:
+                    self.tone(frequency, duration, volume, pinned=True)
 
 class ORVStudyBuddy:
-    def __init__(self):
-        # Initialize GPIO only on Raspberry Pi
-        if IS_RASPBERRY_PI:
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(POWER_BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            GPIO.setup(BUZZER_PIN, GPIO.OUT)
+    def __init__(self, data_dir=None, config=None, time_source=None, writer=None):
+        # The timeline starts with the module imports, followed directly by this constructor
+        import_seconds = MODULE_READY_T - STARTUP_T0
+        self.startup = StartupTimeline(origin=time.perf_counter() - import_seconds)
+        self.startup.add('imports', 0, import_seconds * 1000)
         
-        # Initialize pygame
-        pygame.init()
-        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        self.config = load_config() if config is None else config
+        self.time_source = time_source or SystemClock()
         
-        # Set up display
-        try:
-            self.screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
-            pygame.display.set_caption("ORV Study Buddy")
-        except:
-            # Fallback for headless systems
-            os.environ['SDL_VIDEODRIVER'] = 'dummy'
-            self.screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
-        
-        # Initialize fonts
-        try:
-            self.large_font = pygame.font.Font(None, 36)
-            self.medium_font = pygame.font.Font(None, 24)
-            self.small_font = pygame.font.Font(None, 18)
-        except:
-            # Fallback fonts
-            self.large_font = pygame.font.SysFont('arial', 36)
-            self.medium_font = pygame.font.SysFont('arial', 24)
-            self.small_font = pygame.font.SysFont('arial', 18)
+        # Every in-memory cache reports to this accountant and shares its budget
+        memory_settings = self.config.get('memory_settings', {})
+        budget_kb = memory_settings.get('budget_kb', MEMORY_BUDGET_KB)
+        self.memory = MemoryAccountant(None if budget_kb is None else budget_kb * 1024)
+        self.memory.register('history', self._evict_history)
+        if os.environ.get('ORV_TRACEMALLOC') or memory_settings.get('tracemalloc', False):
+            self.memory.start_tracing()
+        self.memory_report_seconds = memory_settings.get('report_minutes', MEMORY_REPORT_MINUTES) * 60
+        self._memory_reported = self.time_source.monotonic()
+        
+        # Only the modules needed for the first frame are initialized here;
+        # the mixer and GPIO are set up the first time they are used
+        display_settings = self.config.get('display_settings', {})
+        output_spec = os.environ.get('ORV_OUTPUT') or display_settings.get('output', DISPLAY_OUTPUT)
+        
+        with self.startup.phase('display'):
+            # The panel output is opened before SDL starts: only once it works does SDL get
+            # the evdev driver (an offscreen screen plus input), otherwise SDL shows the UI
+            self.output = self._open_output(output_spec)
+            if self.output is not None:
+                os.environ.setdefault('SDL_VIDEODRIVER', OUTPUT_SDL_DRIVER)
+            pygame.display.init()
+            try:
+                self.screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
+                pygame.display.set_caption("ORV Study Buddy")
+            except:
+                # Fallback for headless systems
+                os.environ['SDL_VIDEODRIVER'] = 'dummy'
+                pygame.display.init()
+                self.screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
+        
+        # Desktop buzzer tones are synthesized once and reused
+        self.tone_engine = ToneEngine(memory=self.memory)
+        self.audio = None
+        self.chimes = {}
+        self._gpio_ready = False
+        
+        # Fonts needed by the first frame; other sizes come from the pool on demand
+        with self.startup.phase('fonts'):
+            pygame.font.init()
+            self.assets = AssetManager(memory=self.memory)
+            self.large_font = self.assets.font(36)
+            self.medium_font = self.assets.font(24)
+            self.small_font = self.assets.font(18)
+        
+        # Every draw path renders text through this cache
+        self.text_cache = TextCache(memory=self.memory)
+        
+        # Notes list rows are rendered once and recycled while scrolling
+        self.notes_view = NotesListView(NOTES_LIST_RECT, self.small_font, memory=self.memory)
+        self._notes_view_key = None
         
         # Timer state
         self.timer_state = TimerState.IDLE
         self.kim_dokja_state = KimDokjaState.IDLE
         self.current_session = 0
         self.sessions_completed = 0
-        self.timer_start_time = None
-        self.timer_duration = 0
-        self.paused_time = 0
+        
+        # Every countdown runs in the scheduler; the Pomodoro cycle is one preset on top
+        self.scheduler = TimerScheduler(self.time_source)
+        timer_settings = self.config.get('timer_settings', {})
+        self.work_seconds = timer_settings.get('work_session_minutes', WORK_SESSION_MINUTES) * 60
+        self.short_break_seconds = timer_settings.get('short_break_minutes', SHORT_BREAK_MINUTES) * 60
+        self.long_break_seconds = timer_settings.get('long_break_minutes', LONG_BREAK_MINUTES) * 60
+        self.sessions_before_long_break = timer_settings.get('sessions_before_long_break',
+                                                             SESSIONS_BEFORE_LONG_BREAK)
+        self.timer_presets = self.config.get('timer_presets', {})
         
         # UI state
         self.current_screen = "main"
-        self.notes = self.load_notes()
         self.note_input = ""
         self.virtual_keyboard_active = False
+        self.searching = False
+        self._search_results = (None, None, [])
+        
+        # Rendering
+        self.render_mode = RENDER_MODE
+        self._drawn_screen = None
+        self._region_signatures = {}
+        self._dirty_rects = []
+        self._full_redraw = True
+        
+        # Main loop
+        self.loop_mode = self.config.get('display_settings', {}).get('loop_mode', LOOP_MODE)
+        
+        # Frame profiling, off unless asked for
+        debug_settings = self.config.get('debug_settings', {})
+        self.profiler = FrameProfiler(
+            enabled=bool(os.environ.get('ORV_PROFILE')) or debug_settings.get('profiler', False))
+        self.profile_overlay = False
+        self._overlay_lines = []
+        self._overlay_updated = None
         
         # Animation
         self.animation_frame = 0
-        self.last_animation_update = time.time()
-        
-        # Button handling
-        self.last_button_press = 0
-        self.button_debounce = 0.2
+        self.last_animation_update = self.time_source.time()
         
-        # Setup button interrupt (Raspberry Pi only)
-        if IS_RASPBERRY_PI:
-            GPIO.add_event_detect(POWER_BUTTON_PIN, GPIO.FALLING, 
-                                callback=self.power_button_callback, 
-                                bouncetime=200)
+        # Button handling (GPIO on the Pi, a simulated pin on desktop)
+        self.input_bridge = InputBridge()
+        self.simulated_gpio = None
+        if not IS_RASPBERRY_PI:
+            self.simulated_gpio = SimulatedGPIO()
+            self.simulated_gpio.add_event_detect(self.power_button_callback)
         
         # Clock for frame rate
         self.clock = pygame.time.Clock()
         
         # Create data directory (cross-platform)
-        if IS_RASPBERRY_PI:
+        if data_dir:
+            self.data_dir = data_dir
+        elif IS_RASPBERRY_PI:
             self.data_dir = '/home/pi/orv_study_data'
         else:
             self.data_dir = os.path.join(os.path.expanduser('~'), 'orv_study_data')
         
         os.makedirs(self.data_dir, exist_ok=True)
         
+        # All writes to the data directory go through this writer
+        if writer is not None:
+            self.writer = writer
+        elif self.config.get('data_settings', {}).get('background_writes', BACKGROUND_WRITES):
+            self.writer = BackgroundWriter()
+        else:
+            self.writer = SyncWriter()
+        
+        # Resume a timer that was running when power was lost
+        self.checkpoint = None
+        if self.config.get('data_settings', {}).get('timer_checkpoint', True):
+            with self.startup.phase('checkpoint'):
+                self.checkpoint = TimerCheckpoint(os.path.join(self.data_dir, 'timer.ckpt'),
+                                                  self.time_source, writer=self.writer)
+                self.restore_checkpoint()
+        
+        with self.startup.phase('assets'):
+            self.assets.preload_sprites()
+            
+            # Baked character animations
+            animation_cache_dir = None
+            if display_settings.get('animation_disk_cache', True):
+                animation_cache_dir = os.path.join(self.data_dir, 'anim_cache')
+            self.animations = AnimationBaker(
+                self.draw_character_frame, self.character_cycle_length,
+                cache_dir=animation_cache_dir,
+                budget_bytes=display_settings.get('animation_cache_kb', ANIMATION_CACHE_KB) * 1024,
+                source_signature=self.assets.source_signature,
+                enabled=display_settings.get('baked_animations', BAKED_ANIMATIONS),
+                writer=self.writer, memory=self.memory)
+        
+        # Show the timer as early as possible; history and notes load behind it
+        with self.startup.phase('first_frame'):
+            self.present(self.render_frame())
+        self.startup.mark('first_frame')
+        
+        with self.startup.phase('data_load'):
+            # Session history
+            self.session_journal = SessionJournal(self.data_dir, writer=self.writer,
+                                                  time_source=self.time_source)
+            self.stats = StatsEngine(self.data_dir, self.session_journal, writer=self.writer)
+            # Charts are loaded the first time the stats screen is opened
+            self.analytics = None
+            self._chart_surface = None
+            self._chart_key = None
+            
+            # Notes
+            data_settings = self.config.get('data_settings', {})
+            self.notes_store = NotesStore(self.data_dir,
+                                          max_notes=data_settings.get('max_notes', DEFAULT_MAX_NOTES),
+                                          archive=data_settings.get('archive_notes', True),
+                                          writer=self.writer, memory=self.memory,
+                                          time_source=self.time_source)
+            self.note_index = NoteIndex(self.notes_store, writer=self.writer)
+        
+        # The power button must work right away, so its interrupt is not deferred
+        if IS_RASPBERRY_PI:
+            with self.startup.phase('gpio'):
+                self.init_gpio()
+        
+        self.startup.mark('ready')
+        self._report_startup()
+        
+        # Memory dumps list what has grown since startup finished
+        self.memory.mark_baseline()
+    
+    def _report_startup(self):
+        """Print the cold-start time and dump the timeline if requested"""
+        startup_settings = self.config.get('startup', {})
+        ready_ms = self.startup.marks['ready']
+        print(f"Startup: first frame at {self.startup.marks['first_frame']:.0f} ms, "
+              f"ready at {ready_ms:.0f} ms")
+        
+        budget_ms = startup_settings.get('budget_ms', STARTUP_BUDGET_MS)
+        if ready_ms > budget_ms:
+            print(f"Warning: startup took {ready_ms:.0f} ms, over the {budget_ms} ms budget")
+        
+        trace_path = os.environ.get('ORV_STARTUP_TRACE') or startup_settings.get('trace_file')
+        if trace_path:
+            self.startup.dump(trace_path)
+    
+    def init_gpio(self):
+        """Import RPi.GPIO and set up the pins (Raspberry Pi only)"""
+        if self._gpio_ready or not IS_RASPBERRY_PI:
+            return
+        load_gpio()
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(POWER_BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.setup(BUZZER_PIN, GPIO.OUT)
+        GPIO.add_event_detect(POWER_BUTTON_PIN, GPIO.FALLING, 
+                            callback=self.power_button_callback, 
+                            bouncetime=200)
+        self._gpio_ready = True
+    
+    def init_audio(self):
+        """Start the audio worker on first use"""
+        audio_settings = self.config.get('audio_settings', {})
+        if self.audio is not None or not audio_settings.get('buzzer_enabled', True):
+            return
+        volume = audio_settings.get('volume', 70) / 100
+        backend_name = audio_settings.get('backend', 'auto')
+        self.chimes = chime_patterns(audio_settings.get('buzzer_frequency', BUZZER_FREQUENCY),
+                                     audio_settings.get('buzzer_duration', BUZZER_DURATION_SECONDS))
+        
+        if backend_name == 'fake':
+            backend = FakePWMBackend()
+        elif IS_RASPBERRY_PI:
+            self.init_gpio()
+            backend = PWMBuzzerBackend()
+        else:
+            try:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+                self.tone_engine.prewarm(self.chimes, volume)
+            except pygame.error as e:
+                print(f"Audio unavailable: {e}")
+            backend = MixerBackend(self.tone_engine)
+        
+        self.audio = AudioWorker(backend,
+                                 policy=audio_settings.get('overlap_policy', AUDIO_OVERLAP_POLICY),
+                                 volume=volume)
+    
     def power_button_callback(self, channel):
-        """Handle power button press (Raspberry Pi only)"""
-        current_time = time.time()
-        if current_time - self.last_button_press > self.button_debounce:
-            self.last_button_press = current_time
-            self.handle_power_button()
+        """Handle a power button edge (runs on the GPIO callback thread)"""
+        self.input_bridge.edge("gpio")
     
     def handle_power_button(self):
         """Handle different power button actions based on current state"""
@@ -154,64 +2836,121 @@ class ORVStudyBuddy:
         elif self.timer_state == TimerState.PAUSED:
             self.resume_timer()
     
-    def play_buzzer(self, duration=0.5, frequency=1000):
-        """Play buzzer sound (hardware buzzer on RPi, pygame sound on desktop)"""
-        if IS_RASPBERRY_PI:
-            def buzzer_thread():
-                pwm = GPIO.PWM(BUZZER_PIN, frequency)
-                pwm.start(50)
-                time.sleep(duration)
-                pwm.stop()
-            
-            thread = threading.Thread(target=buzzer_thread)
-            thread.daemon = True
-            thread.start()
+    def play_pattern(self, name):
+        """Queue a multi-tone chime pattern on the audio worker"""
+        if not self.config.get('audio_settings', {}).get('buzzer_enabled', True):
+            return
+        self.init_audio()
+        self.audio.submit(self.chimes[name])
+    
+    def restore_checkpoint(self):
+        """Restore the timer from the checkpoint, accounting for time spent off"""
+        record = self.checkpoint.load()
+        if record is None:
+            return
+        
+        self.sessions_completed = record['sessions_completed']
+        state = record['timer_state']
+        if state == TimerState.IDLE:
+            return
+        
+        offline = self.checkpoint.offline_seconds(record)
+        if offline > CHECKPOINT_MAX_OFFLINE_HOURS * 3600:
+            print(f"Discarding {state.value} timer from {offline / 3600:.1f} hours ago")
+            self.save_checkpoint(sync=True)
+            return
+        
+        self.timer_state = state
+        self.kim_dokja_state = record['character_state']
+        if state == TimerState.PAUSED:
+            self.schedule_pomodoro(record['timer_duration'], elapsed=record['paused_time'], paused=True)
         else:
-            # Desktop fallback: generate beep sound with pygame
-            try:
-                # Generate a simple beep sound
-                sample_rate = 22050
-                frames = int(duration * sample_rate)
-                arr = []
-                for i in range(frames):
-                    wave = 4096 * math.sin(2 * math.pi * frequency * i / sample_rate)
-                    arr.append([int(wave), int(wave)])
-                
-                sound = pygame.sndarray.make_sound(pygame.array.array('i', arr))
-                sound.play()
-            except:
-                # If sound generation fails, just print
-                print(f"BEEP! ({frequency}Hz for {duration}s)")
+            # A timer that ran out while the power was off completes on the first check
+            self.schedule_pomodoro(record['timer_duration'], elapsed=record['elapsed'] + offline)
+        self.save_checkpoint(sync=True)
+        print(f"Restored {state.value} timer ({offline:.0f} s offline), "
+              f"{self.format_time(self.get_remaining_time())} left")
+    
+    def save_checkpoint(self, sync=False):
+        """Record the timer in the checkpoint (cheap, no file I/O on this thread)"""
+        if self.checkpoint is None:
+            return
+        duration = elapsed = paused_time = 0.0
+        timer = self.scheduler.get(POMODORO_TIMER)
+        if timer is not None:
+            duration = timer.duration
+            elapsed = timer.elapsed_at(self.time_source.monotonic())
+            if timer.paused:
+                paused_time = elapsed
+        self.checkpoint.save(self.timer_state, self.kim_dokja_state, self.sessions_completed,
+                             duration, elapsed, paused_time, sync=sync)
+    
+    def schedule_pomodoro(self, seconds, elapsed=0.0, paused=False):
+        """(Re)start the Pomodoro countdown for the current phase"""
+        self.scheduler.add(POMODORO_TIMER, [(self.timer_state.value, seconds)],
+                           on_step=self._pomodoro_step, elapsed=elapsed, paused=paused)
+    
+    def _pomodoro_step(self, timer, label, done):
+        self.timer_complete()
+    
+    def start_preset(self, name):
+        """Start a custom timer from the "timer_presets" config, or stop it if it is running"""
+        if self.scheduler.cancel(name) is not None:
+            print(f"Stopped {name}")
+            return
+        preset = self.timer_presets[name]
+        self.init_audio()
+        self.scheduler.add(name, preset['steps'], rounds=preset.get('rounds', 1),
+                           on_step=self._preset_step)
+        print(f"Started {name}")
+    
+    def _preset_step(self, timer, label, done):
+        """Chime at every step of a custom timer"""
+        if done:
+            self.play_pattern('work_end')
+            print(f"{timer.name} finished")
+        else:
+            self.play_pattern('break_end')
+            print(f"{timer.name}: {label} done, {timer.label} next")
+    
+    def custom_timer(self):
+        """Get the running or paused custom timer that ends soonest, or None"""
+        now = self.time_source.monotonic()
+        timers = [timer for name, timer in self.scheduler.timers.items() if name != POMODORO_TIMER]
+        if not timers:
+            return None
+        return min(timers, key=lambda timer: timer.remaining_at(now))
     
     def start_work_session(self):
         """Start a work session"""
+        # Get the chimes ready now so the end of the session does not stall
+        self.init_audio()
         self.timer_state = TimerState.WORKING
         self.kim_dokja_state = KimDokjaState.WORKING
-        self.timer_duration = WORK_SESSION_MINUTES * 60
-        self.timer_start_time = time.time()
-        self.paused_time = 0
+        self.schedule_pomodoro(self.work_seconds)
+        self.save_checkpoint(sync=True)
         print(f"Started work session {self.sessions_completed + 1}")
     
     def start_break(self, long_break=False):
         """Start break session"""
         if long_break:
             self.timer_state = TimerState.LONG_BREAK
-            self.timer_duration = LONG_BREAK_MINUTES * 60
+            self.schedule_pomodoro(self.long_break_seconds)
             print("Started long break")
         else:
             self.timer_state = TimerState.SHORT_BREAK
-            self.timer_duration = SHORT_BREAK_MINUTES * 60
+            self.schedule_pomodoro(self.short_break_seconds)
             print("Started short break")
         
         self.kim_dokja_state = KimDokjaState.RESTING
-        self.timer_start_time = time.time()
-        self.paused_time = 0
+        self.save_checkpoint(sync=True)
     
     def pause_timer(self):
         """Pause the current timer"""
         if self.timer_state != TimerState.IDLE:
             self.timer_state = TimerState.PAUSED
-            self.paused_time = time.time() - self.timer_start_time
+            self.scheduler.pause(POMODORO_TIMER)
+            self.save_checkpoint(sync=True)
             print("Timer paused")
     
     def resume_timer(self):
@@ -220,24 +2959,33 @@ class ORVStudyBuddy:
             if self.kim_dokja_state == KimDokjaState.WORKING:
                 self.timer_state = TimerState.WORKING
             elif self.kim_dokja_state == KimDokjaState.RESTING:
-                if self.sessions_completed % SESSIONS_BEFORE_LONG_BREAK == 0 and self.sessions_completed > 0:
+                if self.sessions_completed % self.sessions_before_long_break == 0 and self.sessions_completed > 0:
                     self.timer_state = TimerState.LONG_BREAK
                 else:
                     self.timer_state = TimerState.SHORT_BREAK
             
-            self.timer_start_time = time.time() - self.paused_time
+            self.scheduler.resume(POMODORO_TIMER)
+            self.save_checkpoint(sync=True)
             print("Timer resumed")
     
     def check_timer(self):
-        """Check timer status and handle completions"""
-        if self.timer_state in [TimerState.WORKING, TimerState.SHORT_BREAK, TimerState.LONG_BREAK]:
-            elapsed = time.time() - self.timer_start_time
-            if elapsed >= self.timer_duration:
-                self.timer_complete()
+        """Fire every timer that has expired, keep the checkpoint fresh and the caches within budget"""
+        self.scheduler.poll()
+        now = self.time_source.monotonic()
+        if (self.checkpoint is not None and
+                self.timer_state in [TimerState.WORKING, TimerState.SHORT_BREAK, TimerState.LONG_BREAK] and
+                now - self.checkpoint.last_save >= CHECKPOINT_INTERVAL_SECONDS):
+            self.save_checkpoint()
+        self.memory.enforce()
+        if self.memory_report_seconds and now - self._memory_reported >= self.memory_report_seconds:
+            self.log_memory()
     
     def timer_complete(self):
-        """Handle timer completion"""
-        self.play_buzzer(duration=1.0, frequency=800)
+        """Handle the end of a Pomodoro phase"""
+        if self.timer_state == TimerState.WORKING:
+            self.play_pattern('work_end')
+        else:
+            self.play_pattern('break_end')
         
         if self.timer_state == TimerState.WORKING:
             self.sessions_completed += 1
@@ -245,23 +2993,22 @@ class ORVStudyBuddy:
             
             self.save_session_data()
             
-            if self.sessions_completed % SESSIONS_BEFORE_LONG_BREAK == 0:
+            if self.sessions_completed % self.sessions_before_long_break == 0:
                 self.start_break(long_break=True)
             else:
                 self.start_break(long_break=False)
         else:
             self.timer_state = TimerState.IDLE
             self.kim_dokja_state = KimDokjaState.IDLE
+            self.save_checkpoint(sync=True)
             print("Break finished - ready for next session")
     
-    def get_remaining_time(self):
-        """Get remaining time in current timer"""
-        if self.timer_state == TimerState.PAUSED:
-            return self.timer_duration - self.paused_time
-        elif self.timer_state in [TimerState.WORKING, TimerState.SHORT_BREAK, TimerState.LONG_BREAK]:
-            elapsed = time.time() - self.timer_start_time
-            return max(0, self.timer_duration - elapsed)
-        return 0
+    def get_remaining_time(self, name=POMODORO_TIMER):
+        """Get remaining time in a timer (the Pomodoro one by default)"""
+        timer = self.scheduler.get(name)
+        if timer is None:
+            return 0
+        return timer.remaining_at(self.time_source.monotonic())
     
     def format_time(self, seconds):
         """Format seconds to MM:SS"""
@@ -271,78 +3018,67 @@ class ORVStudyBuddy:
     
     def draw_kim_dokja(self, x, y, size=60):
         """Draw Kim Dokja character with static sprite support"""
-        sprite_name = self._get_sprite_name()
+        state = self.kim_dokja_state
+        has_sprite = self.assets.character_sprite(state.value, size) is not None
+        ticks = self.time_source.ticks() // 100
         
-        if self._draw_sprite(sprite_name, x, y, size):
-            self._add_sprite_effects(x, y, size)
-            return
-        
-        frame = (pygame.time.get_ticks() // 100) % 8
-        self._draw_simple_animated_character(x, y, size, frame)
-
-    def _get_sprite_name(self):
-        """Generate sprite filename based on current state"""
-        state_names = {
-            KimDokjaState.IDLE: "idle",
-            KimDokjaState.WORKING: "idle",
-            KimDokjaState.RESTING: "idle",
-            KimDokjaState.CELEBRATING: "idle"
-        }
+        if self.animations.enabled:
+            frames = self.animations.frames(state, size, has_sprite)
+            if frames:
+                frame = frames[ticks % len(frames)]
+                self.screen.blit(frame, frame.get_rect(center=(x, y)))
+                return
         
-        state = state_names.get(self.kim_dokja_state, "idle")
-        return f"kim_dokja_{state}.png"
+        self.draw_character_frame(self.screen, state, x, y, size, ticks, has_sprite)
+    
+    def character_cycle_length(self, state, has_sprite):
+        """Number of frames in a state's animation cycle"""
+        if has_sprite:
+            # The idle sprite has no effects, so it never changes
+            return 1 if state == KimDokjaState.IDLE else 60
+        return 8
+    
+    def draw_character_frame(self, surface, state, x, y, size, frame, has_sprite):
+        """Draw one animation frame of the character onto a surface"""
+        if has_sprite:
+            self._draw_sprite(surface, state, x, y, size)
+            self._add_sprite_effects(surface, state, x, y, size, frame % 60)
+        else:
+            self._draw_simple_animated_character(surface, state, x, y, size, frame % 8)
 
-    def _add_sprite_effects(self, x, y, size):
+    def _add_sprite_effects(self, surface, state, x, y, size, frame):
         """Add subtle animation effects to static sprites"""
-        frame = (pygame.time.get_ticks() // 100) % 60
-        
         float_offset = int(3 * math.sin(frame * 0.1))
         
-        if self.kim_dokja_state == KimDokjaState.WORKING:
+        if state == KimDokjaState.WORKING:
             book_x = x + size//3
             book_y = y - size//3 + float_offset
-            pygame.draw.rect(self.screen, BLUE, (book_x, book_y, 12, 8))
-            pygame.draw.rect(self.screen, BLACK, (book_x, book_y, 12, 8), 1)
+            pygame.draw.rect(surface, BLUE, (book_x, book_y, 12, 8))
+            pygame.draw.rect(surface, BLACK, (book_x, book_y, 12, 8), 1)
             
-        elif self.kim_dokja_state == KimDokjaState.RESTING:
+        elif state == KimDokjaState.RESTING:
             if frame % 40 < 30:
-                font_small = pygame.font.Font(None, 20)
-                zzz_text = font_small.render("z", True, (100, 100, 100))
+                zzz_text = self.render_text(self.assets.font(20), "z", (100, 100, 100))
                 zzz_x = x + size//3 + int(2 * math.sin(frame * 0.2))
                 zzz_y = y - size//2 + float_offset
-                self.screen.blit(zzz_text, (zzz_x, zzz_y))
+                surface.blit(zzz_text, (zzz_x, zzz_y))
                 
-        elif self.kim_dokja_state == KimDokjaState.CELEBRATING:
-            import random
-            random.seed(frame)
+        elif state == KimDokjaState.CELEBRATING:
+            # A private generator keeps the sparkle layout per frame stable
+            rng = random.Random(frame)
             for i in range(3):
-                sparkle_x = x + random.randint(-size//2, size//2)
-                sparkle_y = y + random.randint(-size//2, size//2) + float_offset
-                sparkle_size = random.randint(2, 4)
-                pygame.draw.circle(self.screen, YELLOW, (sparkle_x, sparkle_y), sparkle_size)
+                sparkle_x = x + rng.randint(-size//2, size//2)
+                sparkle_y = y + rng.randint(-size//2, size//2) + float_offset
+                sparkle_size = rng.randint(2, 4)
+                pygame.draw.circle(surface, YELLOW, (sparkle_x, sparkle_y), sparkle_size)
 
-    def _draw_sprite(self, sprite_name, x, y, size):
-        """Try to load and draw sprite image"""
-        try:
-            sprite_path = f"assets/characters/{sprite_name}"
-            
-            if not hasattr(self, '_sprite_cache'):
-                self._sprite_cache = {}
-                
-            if sprite_name not in self._sprite_cache:
-                sprite = pygame.image.load(sprite_path).convert_alpha()
-                sprite = pygame.transform.scale(sprite, (size, size))
-                self._sprite_cache[sprite_name] = sprite
-            
-            sprite = self._sprite_cache[sprite_name]
-            sprite_rect = sprite.get_rect(center=(x, y))
-            self.screen.blit(sprite, sprite_rect)
-            return True
-            
-        except (pygame.error, FileNotFoundError):
-            return False
+    def _draw_sprite(self, surface, state, x, y, size):
+        """Draw the preloaded sprite for a state"""
+        sprite = self.assets.character_sprite(state.value, size)
+        sprite_rect = sprite.get_rect(center=(x, y))
+        surface.blit(sprite, sprite_rect)
 
-    def _draw_simple_animated_character(self, x, y, size, frame):
+    def _draw_simple_animated_character(self, surface, state, x, y, size, frame):
         """Enhanced fallback drawing with better animation"""
         colors = {
             KimDokjaState.IDLE: WHITE,
@@ -350,117 +3086,413 @@ class ORVStudyBuddy:
             KimDokjaState.RESTING: GREEN,
             KimDokjaState.CELEBRATING: ORANGE
         }
-        color = colors.get(self.kim_dokja_state, WHITE)
+        color = colors.get(state, WHITE)
         
         breath_offset = int(2 * math.sin(frame * 0.5))
         char_y = y + breath_offset
         
-        pygame.draw.circle(self.screen, color, (x, char_y), size//2)
-        pygame.draw.circle(self.screen, BLACK, (x, char_y), size//2, 2)
+        pygame.draw.circle(surface, color, (x, char_y), size//2)
+        pygame.draw.circle(surface, BLACK, (x, char_y), size//2, 2)
         
         eye_y = char_y - size//6
         eye_size = 3
         
         if frame % 60 < 3:
-            pygame.draw.line(self.screen, BLACK, 
+            pygame.draw.line(surface, BLACK, 
                             (x-size//6-2, eye_y), (x-size//6+2, eye_y), 2)
-            pygame.draw.line(self.screen, BLACK, 
+            pygame.draw.line(surface, BLACK, 
                             (x+size//6-2, eye_y), (x+size//6+2, eye_y), 2)
         else:
-            pygame.draw.circle(self.screen, BLACK, (x-size//6, eye_y), eye_size)
-            pygame.draw.circle(self.screen, BLACK, (x+size//6, eye_y), eye_size)
+            pygame.draw.circle(surface, BLACK, (x-size//6, eye_y), eye_size)
+            pygame.draw.circle(surface, BLACK, (x+size//6, eye_y), eye_size)
         
         mouth_y = char_y + size//6
         
-        if self.kim_dokja_state == KimDokjaState.CELEBRATING:
+        if state == KimDokjaState.CELEBRATING:
             bounce = int(2 * math.sin(frame * 0.8))
-            pygame.draw.arc(self.screen, BLACK, 
+            pygame.draw.arc(surface, BLACK, 
                            (x-size//4, mouth_y-5+bounce, size//2, 10), 
                            0, math.pi, 3)
-        elif self.kim_dokja_state == KimDokjaState.WORKING:
-            pygame.draw.line(self.screen, BLACK, 
+        elif state == KimDokjaState.WORKING:
+            pygame.draw.line(surface, BLACK, 
                             (x-size//8, mouth_y), (x+size//8, mouth_y), 2)
-            pygame.draw.rect(self.screen, BLUE, (x+size//3, char_y-5, 8, 6))
-        elif self.kim_dokja_state == KimDokjaState.RESTING:
+            pygame.draw.rect(surface, BLUE, (x+size//3, char_y-5, 8, 6))
+        elif state == KimDokjaState.RESTING:
             mouth_width = 6 + int(2 * math.sin(frame * 0.3))
-            pygame.draw.ellipse(self.screen, BLACK, 
+            pygame.draw.ellipse(surface, BLACK, 
                                (x-mouth_width//2, mouth_y-2, mouth_width, 4))
             if frame % 30 < 20:
-                font_small = pygame.font.Font(None, 16)
-                zzz_text = font_small.render("z", True, BLACK)
-                self.screen.blit(zzz_text, (x+size//3, char_y-size//3))
+                zzz_text = self.render_text(self.assets.font(16), "z", BLACK)
+                surface.blit(zzz_text, (x+size//3, char_y-size//3))
         else:
-            pygame.draw.circle(self.screen, BLACK, (x, mouth_y), 2)
+            pygame.draw.circle(surface, BLACK, (x, mouth_y), 2)
     
-    def draw_main_screen(self):
-        """Draw the main timer screen"""
-        self.screen.fill(BLACK)
-        
-        title_text = self.large_font.render("ORV Study Buddy", True, WHITE)
-        title_rect = title_text.get_rect(center=(DISPLAY_WIDTH//2, 30))
-        self.screen.blit(title_text, title_rect)
-        
-        self.draw_kim_dokja(DISPLAY_WIDTH//2, 100)
+    def toggle_render_mode(self):
+        """Switch between dirty-rectangle and full-frame rendering"""
+        self.render_mode = "full" if self.render_mode == "dirty" else "dirty"
+        self._drawn_screen = None
+        print(f"Render mode: {self.render_mode}")
+    
+    def toggle_profile_overlay(self):
+        """Show or hide the performance overlay, profiling while it is visible"""
+        self.profile_overlay = not self.profile_overlay
+        if self.profile_overlay:
+            self.profiler.enabled = True
+            self._overlay_updated = None
+        else:
+            self.profiler.enabled = bool(os.environ.get('ORV_PROFILE')) or \
+                self.config.get('debug_settings', {}).get('profiler', False)
+        self._drawn_screen = None
+        print(f"Profiler overlay: {'on' if self.profile_overlay else 'off'}")
+    
+    def dump_frame_trace(self):
+        """Write the profiler ring buffer as a Chrome trace into the data directory"""
+        trace = self.profiler.trace()
+        if trace is None:
+            print("No profiled frames yet - press F3 to start profiling")
+            return
+        path = os.path.join(self.data_dir, time.strftime('frame-trace-%Y%m%d-%H%M%S.json'))
+        self.writer.write_json(path, trace)
+        print(f"Frame trace written to {path}")
+    
+    def log_memory(self):
+        """Append RSS and per-cache usage to memory.jsonl, for checking long uptimes stay flat"""
+        self._memory_reported = self.time_source.monotonic()
+        stats = self.memory.stats()
+        record = {
+            'time': datetime.fromtimestamp(self.time_source.time()).isoformat(timespec='seconds'),
+            'rss_kb': stats['rss_kb'],
+            'used_kb': stats['used_kb'],
+            'caches': {cache: usage['kb'] for cache, usage in stats['caches'].items()}
+        }
+        if tracemalloc.is_tracing():
+            record['traced_kb'] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+        self.writer.append_record(os.path.join(self.data_dir, 'memory.jsonl'), record)
+    
+    def dump_memory(self):
+        """Write RSS, cache usage and tracemalloc allocation sites into the data directory"""
+        path = os.path.join(self.data_dir, time.strftime('memory-%Y%m%d-%H%M%S.json'))
+        self.writer.write_json(path, self.memory.report())
+        if tracemalloc.is_tracing():
+            print(f"Memory dump written to {path}")
+        else:
+            print(f"Memory dump written to {path} (set ORV_TRACEMALLOC=1 for allocation sites)")
+    
+    def draw_profile_overlay(self):
+        """Draw FPS, worst frame and per-phase times over the current screen"""
+        now = time.perf_counter()
+        if self._overlay_updated is None or now - self._overlay_updated >= PROFILE_OVERLAY_REFRESH_SECONDS:
+            self._overlay_updated = now
+            summary = self.profiler.summary()
+            if summary is None:
+                self._overlay_lines = ["profiling..."]
+            else:
+                phase_ms = summary['phase_ms']
+                self._overlay_lines = [
+                    f"{summary['fps']:.1f} fps  worst {summary['worst_ms']:.1f} ms",
+                    f"cpu {summary['cpu_percent']:.0f}%  draw {phase_ms['draw']:.2f}  "
+                    f"flip {phase_ms['present']:.2f}",
+                    f"timer {phase_ms['check_timer']:.2f}  anim {phase_ms['update_animation']:.2f}  "
+                    f"evt {phase_ms['events']:.2f}"
+                ]
         
-        remaining_time = self.get_remaining_time()
-        time_text = self.large_font.render(self.format_time(remaining_time), True, WHITE)
-        time_rect = time_text.get_rect(center=(DISPLAY_WIDTH//2, 150))
-        self.screen.blit(time_text, time_rect)
+        rect = pygame.Rect(PROFILE_OVERLAY_RECT)
+        self.screen.fill(BLACK, rect)
+        pygame.draw.rect(self.screen, YELLOW, rect, 1)
+        # Rendered directly: these strings change constantly and would only churn the text cache
+        font = self.assets.font(16)
+        for i, line in enumerate(self._overlay_lines):
+            self.screen.blit(font.render(line, True, YELLOW), (rect.x + 3, rect.y + 2 + i * 14))
+        return rect
+    
+    def _begin_screen(self, screen_name):
+        """Start drawing a screen, returns True if everything must be redrawn"""
+        self._full_redraw = (self.render_mode == "full" or self._drawn_screen != screen_name)
+        if self._full_redraw:
+            self._region_signatures.clear()
+            self.screen.fill(BLACK)
+        self._drawn_screen = screen_name
+        self._dirty_rects = []
+        return self._full_redraw
+    
+    def _draw_region(self, name, rect, signature, draw_fn):
+        """Redraw a screen region only if its signature changed since the last frame"""
+        if not self._full_redraw and self._region_signatures.get(name) == signature:
+            return
+        self._region_signatures[name] = signature
         
-        status_text = ""
+        self.screen.set_clip(rect)
+        if not self._full_redraw:
+            self.screen.fill(BLACK, rect)
+        draw_fn()
+        self.screen.set_clip(None)
+        self._dirty_rects.append(rect)
+    
+    def _end_screen(self):
+        """Finish drawing a screen, returns the changed rects (None means the whole screen)"""
+        if self._full_redraw:
+            return None
+        return self._dirty_rects
+    
+    def _open_output(self, spec):
+        """Open an RGB565 output, or None for "sdl" or if the target cannot be opened"""
+        if spec == "sdl":
+            return None
+        try:
+            return RGB565Output(spec, bgr=self.config.get('display_settings', {}).get('output_bgr', False))
+        except (RuntimeError, ValueError, OSError) as e:
+            print(f"Display output {spec} unavailable ({e}), using SDL")
+            return None
+    
+    def set_output(self, spec):
+        """Switch the display output ("sdl", "fb:<device>", "file:<path>" or "memory")"""
+        if self.output is not None:
+            self.output.close()
+        self.output = self._open_output(spec)
+        if self.output is None and pygame.display.get_driver() in HEADLESS_SDL_DRIVERS:
+            print(f"Warning: SDL is running the {pygame.display.get_driver()} driver, "
+                  f"so nothing will be visible")
+        # The new target starts out blank, so push a whole frame next
+        self._drawn_screen = None
+    
+    def present(self, dirty_rects):
+        """Push the drawn frame to the display"""
+        if self.output is not None:
+            if dirty_rects is None or dirty_rects:
+                self.output.write(self.screen, dirty_rects)
+        elif dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+    
+    def get_status_text(self):
+        """Get the status line for the current timer state"""
         if self.timer_state == TimerState.IDLE:
-            status_text = "Press SPACE to start!" if not IS_RASPBERRY_PI else "Press button to start!"
+            return "Press SPACE to start!" if not IS_RASPBERRY_PI else "Press button to start!"
         elif self.timer_state == TimerState.WORKING:
-            status_text = f"Work Session {self.sessions_completed + 1}"
+            return f"Work Session {self.sessions_completed + 1}"
         elif self.timer_state == TimerState.SHORT_BREAK:
-            status_text = "Short Break"
+            return "Short Break"
         elif self.timer_state == TimerState.LONG_BREAK:
-            status_text = "Long Break"
+            return "Long Break"
         elif self.timer_state == TimerState.PAUSED:
-            status_text = "Paused - Press SPACE to resume" if not IS_RASPBERRY_PI else "Paused - Press to resume"
+            return "Paused - Press SPACE to resume" if not IS_RASPBERRY_PI else "Paused - Press to resume"
+        return ""
+    
+    def render_text(self, font, text, color, antialias=True):
+        """Render text through the shared text cache"""
+        return self.text_cache.render(font, text, color, antialias)
+    
+    def _blit_centered(self, surface, center):
+        """Blit a surface centered on a point"""
+        self.screen.blit(surface, surface.get_rect(center=center))
+    
+    def draw_main_screen(self):
+        """Draw the main timer screen, returns the changed rects"""
+        if self._begin_screen("main"):
+            title_text = self.render_text(self.large_font, "ORV Study Buddy", WHITE)
+            self._blit_centered(title_text, (DISPLAY_WIDTH//2, 30))
+            
+            pygame.draw.rect(self.screen, DARK_BLUE, (10, 210, 60, 25))
+            notes_text = self.render_text(self.small_font, "Notes", WHITE)
+            self.screen.blit(notes_text, (15, 215))
+            
+            pygame.draw.rect(self.screen, DARK_BLUE, (250, 210, 60, 25))
+            stats_text = self.render_text(self.small_font, "Stats", WHITE)
+            self.screen.blit(stats_text, (255, 215))
         
-        status_surface = self.medium_font.render(status_text, True, WHITE)
-        status_rect = status_surface.get_rect(center=(DISPLAY_WIDTH//2, 180))
-        self.screen.blit(status_surface, status_rect)
+        state = self.kim_dokja_state
+        has_sprite = self.assets.character_sprite(state.value, 60) is not None
+        sprite_frame = (self.time_source.ticks() // 100) % self.character_cycle_length(state, has_sprite)
+        self._draw_region("sprite", SPRITE_RECT, (state, sprite_frame),
+                          lambda: self.draw_kim_dokja(DISPLAY_WIDTH//2, 100))
         
-        session_text = f"Sessions completed: {self.sessions_completed}"
-        session_surface = self.small_font.render(session_text, True, WHITE)
-        session_rect = session_surface.get_rect(center=(DISPLAY_WIDTH//2, 200))
-        self.screen.blit(session_surface, session_rect)
+        time_string = self.format_time(self.get_remaining_time())
+        self._draw_region("timer", TIMER_RECT, time_string,
+                          lambda: self._blit_centered(self.render_text(self.large_font, time_string, WHITE),
+                                                      (DISPLAY_WIDTH//2, 150)))
+        
+        status_text = self.get_status_text()
+        self._draw_region("status", STATUS_RECT, status_text,
+                          lambda: self._blit_centered(self.render_text(self.medium_font, status_text, WHITE),
+                                                      (DISPLAY_WIDTH//2, 180)))
         
-        pygame.draw.rect(self.screen, DARK_BLUE, (10, 210, 60, 25))
-        notes_text = self.small_font.render("Notes", True, WHITE)
-        self.screen.blit(notes_text, (15, 215))
+        session_text = f"Sessions completed: {self.sessions_completed}"
+        custom = self.custom_timer()
+        if custom is not None:
+            remaining = self.format_time(math.ceil(custom.remaining_at(self.time_source.monotonic())))
+            session_text = f"Sessions: {self.sessions_completed}   {custom.name} {custom.label} {remaining}"
+        self._draw_region("sessions", SESSION_RECT, session_text,
+                          lambda: self._blit_centered(self.render_text(self.small_font, session_text, WHITE),
+                                                      (DISPLAY_WIDTH//2, 200)))
         
-        pygame.draw.rect(self.screen, DARK_BLUE, (250, 210, 60, 25))
-        stats_text = self.small_font.render("Stats", True, WHITE)
-        self.screen.blit(stats_text, (255, 215))
+        return self._end_screen()
+    
+    def search_notes(self, query):
+        """Get (id, text) pairs for a search, reusing the last result while nothing changed"""
+        cached_query, cached_version, results = self._search_results
+        if query != cached_query or self.note_index.version != cached_version:
+            results = [(note_id, self.notes_store.get(note_id))
+                       for note_id in self.note_index.search(query)]
+            self._search_results = (query, self.note_index.version, results)
+        return results
+    
+    def _latest_note_row(self, index):
+        """Row index 0 is the newest live note"""
+        note_id = self.notes_store.next_id - 1 - index
+        return note_id, self.notes_store.get(note_id)
+    
+    def _draw_note_input(self):
+        """Draw the note input field"""
+        if self.virtual_keyboard_active or self.searching:
+            pygame.draw.rect(self.screen, DARK_BLUE if self.searching else DARK_GRAY, NOTE_INPUT_RECT)
+            input_text = self.render_text(self.small_font, self.note_input[-25:], WHITE)
+            self.screen.blit(input_text, (125, 210))
     
     def draw_notes_screen(self):
-        """Draw the notes screen"""
-        self.screen.fill(BLACK)
+        """Draw the notes screen, returns the changed rects"""
+        if self._begin_screen("notes"):
+            title_text = self.render_text(self.medium_font, "Notes", WHITE)
+            self.screen.blit(title_text, (10, 10))
+            
+            pygame.draw.rect(self.screen, DARK_BLUE, (250, 5, 60, 25))
+            back_text = self.render_text(self.small_font, "Back", WHITE)
+            self.screen.blit(back_text, (270, 10))
+            
+            pygame.draw.rect(self.screen, GREEN, (10, 200, 100, 30))
+            add_text = self.render_text(self.small_font, "Add Note", WHITE)
+            self.screen.blit(add_text, (25, 210))
+            
+            pygame.draw.rect(self.screen, DARK_BLUE, (170, 5, 70, 25))
+            find_text = self.render_text(self.small_font, "Find", WHITE)
+            self.screen.blit(find_text, (190, 10))
         
-        title_text = self.medium_font.render("Notes", True, WHITE)
-        self.screen.blit(title_text, (10, 10))
+        # A new search (or leaving one) starts at the top of the list
+        view_key = (self.searching, self.note_input if self.searching else None)
+        if view_key != self._notes_view_key:
+            self._notes_view_key = view_key
+            self.notes_view.scroll_to_top()
         
-        pygame.draw.rect(self.screen, DARK_BLUE, (250, 5, 60, 25))
-        back_text = self.small_font.render("Back", True, WHITE)
-        self.screen.blit(back_text, (270, 10))
+        if self.searching:
+            results = self.search_notes(self.note_input)
+            self.notes_view.set_count(len(results))
+            row_at = results.__getitem__
+        else:
+            self.notes_view.set_count(self.notes_store.count())
+            row_at = self._latest_note_row
+        self._draw_region("notes_list", NOTES_LIST_RECT,
+                          (view_key, self.notes_store.next_id) + self.notes_view.signature(),
+                          lambda: self.notes_view.draw(self.screen, row_at))
         
-        y_offset = 40
-        for i, note in enumerate(self.notes[-8:]):
-            note_text = self.small_font.render(f"{i+1}. {note[:40]}", True, WHITE)
-            self.screen.blit(note_text, (10, y_offset))
-            y_offset += 20
+        self._draw_region("note_input", NOTE_INPUT_RECT,
+                          (self.virtual_keyboard_active, self.searching, self.note_input[-25:]),
+                          self._draw_note_input)
         
-        pygame.draw.rect(self.screen, GREEN, (10, 200, 100, 30))
-        add_text = self.small_font.render("Add Note", True, WHITE)
-        self.screen.blit(add_text, (25, 210))
+        return self._end_screen()
+    
+    def _draw_stats_body(self, summary, chart=None):
+        """Draw the statistics lines and the cached chart"""
+        total_hours, total_minutes = divmod(summary['total_minutes'], 60)
+        lines = [
+            f"Today: {summary['today_minutes']} min",
+            f"This week: {summary['week_minutes']} min",
+            f"All time: {total_hours}h {total_minutes}m ({summary['total_sessions']} sessions)",
+            f"Streak: {summary['current_streak']} days (best {summary['longest_streak']})"
+        ]
+        y_offset = 50
+        for line in lines:
+            line_text = self.render_text(self.medium_font, line, WHITE)
+            self.screen.blit(line_text, (10, y_offset))
+            y_offset += 30
         
-        if self.virtual_keyboard_active:
-            pygame.draw.rect(self.screen, DARK_GRAY, (120, 200, 190, 30))
-            input_text = self.small_font.render(self.note_input[-25:], True, WHITE)
-            self.screen.blit(input_text, (125, 210))
+        if chart is not None:
+            self.screen.blit(chart, STATS_CHART_RECT.topleft)
+    
+    def load_analytics(self):
+        """Load the NumPy session history on first use, returns None without NumPy"""
+        if self.analytics is None and np is not None:
+            self.analytics = SessionAnalytics(self.data_dir, self.session_journal, writer=self.writer)
+            self.memory.add('history', 'analytics', self.analytics.nbytes)
+        elif self.analytics is not None:
+            self.memory.touch('history', 'analytics')
+        return self.analytics
+    
+    def _evict_history(self, key):
+        """Drop the session history columns or the chart built from them"""
+        if key == 'analytics':
+            # A reloaded history restarts its version count, so the chart must be rebuilt
+            self.analytics = None
+            self.memory.remove('history', 'chart')
+        self._chart_surface = None
+        self._chart_key = None
+    
+    def stats_chart(self, today):
+        """Get the heatmap and hour chart surface, rebuilt only when the history changes"""
+        analytics = self.load_analytics()
+        if analytics is None:
+            return None
+        key = (analytics.version, today)
+        if key == self._chart_key:
+            self.memory.touch('history', 'chart')
+            return self._chart_surface
+        
+        surface = pygame.Surface(STATS_CHART_RECT.size)
+        surface.fill(BLACK)
+        
+        # Daily heatmap, one column per week, brighter for more focus time
+        grid = analytics.heatmap(today)
+        peak = max(float(grid.max()), 1.0)
+        cell = 7
+        for week in range(grid.shape[1]):
+            for weekday in range(7):
+                level = grid[weekday, week] / peak
+                color = (int(25 + 45 * level), int(25 + 230 * level), int(40 + 60 * level)) \
+                    if level else (40, 40, 50)
+                surface.fill(color, (week * (cell + 1), weekday * (cell + 1), cell, cell))
+        
+        # Hour-of-day focus distribution
+        hours = analytics.hour_histogram()
+        hour_peak = max(float(hours.max()), 1.0)
+        chart_x = grid.shape[1] * (cell + 1) + 12
+        bar_width = (STATS_CHART_RECT.width - chart_x) // 24
+        for hour in range(24):
+            height = int(round(hours[hour] / hour_peak * (STATS_CHART_RECT.height - 2)))
+            if height:
+                surface.fill(BLUE, (chart_x + hour * bar_width, STATS_CHART_RECT.height - height,
+                                    bar_width - 1, height))
+        
+        self._chart_surface = surface
+        self._chart_key = key
+        self.memory.add('history', 'chart', surface_bytes(surface))
+        return surface
+    
+    def draw_stats_screen(self):
+        """Draw the statistics screen, returns the changed rects"""
+        if self._begin_screen("stats"):
+            title_text = self.render_text(self.medium_font, "Stats", WHITE)
+            self.screen.blit(title_text, (10, 10))
+            
+            pygame.draw.rect(self.screen, DARK_BLUE, (250, 5, 60, 25))
+            back_text = self.render_text(self.small_font, "Back", WHITE)
+            self.screen.blit(back_text, (270, 10))
+        
+        today = datetime.fromtimestamp(self.time_source.time()).date()
+        summary = self.stats.summary(today)
+        chart = self.stats_chart(today)
+        self._draw_region("stats_body", STATS_BODY_RECT, tuple(summary.values()) + (self._chart_key,),
+                          lambda: self._draw_stats_body(summary, chart))
+        
+        return self._end_screen()
+    
+    def render_frame(self):
+        """Draw the current screen, returns the changed rects"""
+        if self.current_screen == "main":
+            return self.draw_main_screen()
+        elif self.current_screen == "notes":
+            return self.draw_notes_screen()
+        elif self.current_screen == "stats":
+            return self.draw_stats_screen()
+        return []
     
     def handle_touch(self, pos):
         """Handle touch screen input"""
@@ -475,115 +3507,268 @@ class ORVStudyBuddy:
         elif self.current_screen == "notes":
             if 250 <= x <= 310 and 5 <= y <= 30:
                 self.current_screen = "main"
+                self.searching = False
+                self.virtual_keyboard_active = False
+            elif 170 <= x <= 240 and 5 <= y <= 30:
+                # Find toggles search mode; typing filters the list as you go
+                self.searching = not self.searching
+                self.virtual_keyboard_active = self.searching
+                self.note_input = ""
             elif 10 <= x <= 110 and 200 <= y <= 230:
+                self.searching = False
                 self.virtual_keyboard_active = True
                 self.note_input = ""
+        
+        elif self.current_screen == "stats":
+            if 250 <= x <= 310 and 5 <= y <= 30:
+                self.current_screen = "main"
     
     def show_stats(self):
         """Show session statistics"""
-        total_time = self.sessions_completed * WORK_SESSION_MINUTES
-        print(f"Total study time: {total_time} minutes")
-        print(f"Sessions completed: {self.sessions_completed}")
-    
-    def load_notes(self):
-        """Load notes from file"""
-        try:
-            with open(os.path.join(self.data_dir, 'notes.json'), 'r') as f:
-                return json.load(f)
-        except:
-            return []
+        self.current_screen = "stats"
+        today = datetime.fromtimestamp(self.time_source.time()).date()
+        summary = self.stats.summary(today)
+        print(f"Total study time: {summary['total_minutes']} minutes")
+        print(f"Sessions completed: {summary['total_sessions']}")
+        analytics = self.load_analytics()
+        if analytics is not None and analytics.size:
+            current, longest = analytics.streaks(today)
+            weekly = analytics.weekly_totals(today)
+            print(f"Focus peaks at {int(analytics.hour_histogram().argmax()):02d}:00, "
+                  f"streak {current} days (best {longest})")
+            print(f"Last {len(weekly)} weeks: {[int(minutes) for minutes in weekly]}")
+        print(f"Text cache: {self.text_cache.stats()}")
+        print(f"Memory: {self.memory.stats()}")
+        print(f"Input: {self.input_bridge.stats()}")
+        print(f"Storage: {self.writer.stats()}")
+        if self.audio is not None:
+            print(f"Audio: {self.audio.stats()}")
     
-    def save_notes(self):
-        """Save notes to file"""
+    def add_note(self, text):
+        """Store a new note"""
         try:
-            with open(os.path.join(self.data_dir, 'notes.json'), 'w') as f:
-                json.dump(self.notes, f)
+            note_id = self.notes_store.append(text)
+            self.note_index.add(note_id, text)
         except Exception as e:
             print(f"Error saving notes: {e}")
     
     def save_session_data(self):
         """Save session completion data"""
         session_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.fromtimestamp(self.time_source.time()).isoformat(),
             'session_number': self.sessions_completed,
-            'duration_minutes': WORK_SESSION_MINUTES
+            'duration_minutes': self.work_seconds // 60,
+            'type': 'work'
         }
         
         try:
-            sessions = []
-            try:
-                with open(os.path.join(self.data_dir, 'sessions.json'), 'r') as f:
-                    sessions = json.load(f)
-            except:
-                pass
-            
-            sessions.append(session_data)
-            
-            with open(os.path.join(self.data_dir, 'sessions.json'), 'w') as f:
-                json.dump(sessions, f)
+            self.session_journal.append(session_data)
+            self.stats.record(session_data)
+            if self.analytics is not None:
+                self.analytics.record(session_data)
+                self.memory.add('history', 'analytics', self.analytics.nbytes)
         except Exception as e:
             print(f"Error saving session data: {e}")
     
     def update_animation(self):
-        """Update character animation"""
-        current_time = time.time()
+        """Update character animation and notes list scrolling"""
+        current_time = self.time_source.time()
+        if self.current_screen == "notes":
+            self.notes_view.step(current_time)
         if current_time - self.last_animation_update > 0.5:
             self.animation_frame = (self.animation_frame + 1) % 4
             self.last_animation_update = current_time
     
+    def next_deadline(self):
+        """Seconds until the loop next needs to run, or None if only input can change anything"""
+        deadlines = []
+        
+        # Shown countdowns change (and timers expire) on whole-second boundaries
+        shown = []
+        if self.timer_state in [TimerState.WORKING, TimerState.SHORT_BREAK, TimerState.LONG_BREAK]:
+            shown.append(self.get_remaining_time())
+        custom = self.custom_timer()
+        if custom is not None and not custom.paused:
+            shown.append(custom.remaining_at(self.time_source.monotonic()))
+        for remaining in shown:
+            until_tick = remaining - math.floor(remaining)
+            deadlines.append(until_tick if until_tick > 0 else min(1.0, remaining))
+        
+        # Timers that are not on screen still need waking for
+        next_expiry = self.scheduler.next_deadline()
+        if next_expiry is not None:
+            deadlines.append(max(0.0, next_expiry - self.time_source.monotonic()))
+        
+        if self.current_screen == "main":
+            state = self.kim_dokja_state
+            has_sprite = self.assets.character_sprite(state.value, 60) is not None
+            if self.character_cycle_length(state, has_sprite) > 1:
+                tick_ms = int(ANIMATION_TICK_SECONDS * 1000)
+                deadlines.append((tick_ms - self.time_source.ticks() % tick_ms) / 1000)
+        
+        if self.current_screen == "notes" and self.notes_view.moving:
+            deadlines.append(1 / NOTE_SCROLL_FPS)
+        
+        if self.profile_overlay:
+            deadlines.append(PROFILE_OVERLAY_REFRESH_SECONDS)
+        
+        # The memory log has to keep going while the device sits idle
+        if self.memory_report_seconds:
+            deadlines.append(max(0.0, self._memory_reported + self.memory_report_seconds -
+                                 self.time_source.monotonic()))
+        
+        if not deadlines:
+            return None
+        return min(deadlines) + DEADLINE_SLACK_SECONDS
+    
+    def wait_for_events(self):
+        """Block until input arrives or the next deadline passes"""
+        if self.loop_mode != "deadline":
+            self.clock.tick(FIXED_FPS)
+            return self.input_bridge.drain() + pygame.event.get()
+        
+        timeout = self.next_deadline()
+        if timeout is None:
+            event = pygame.event.wait()
+        else:
+            event = pygame.event.wait(max(1, int(timeout * 1000)))
+        
+        events = self.input_bridge.drain()
+        if event.type != pygame.NOEVENT:
+            events.append(event)
+        events.extend(pygame.event.get())
+        return events
+    
+    def handle_event(self, event):
+        """Handle one input event, returns False to quit"""
+        if event.type == pygame.QUIT:
+            return False
+        elif event.type == BUTTON_EVENT:
+            self.input_bridge.handled(event)
+            self.handle_power_button()
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if (self.current_screen == "notes" and event.button == 1 and
+                    NOTES_LIST_RECT.collidepoint(event.pos)):
+                self.notes_view.press(event.pos, self.time_source.time())
+            elif event.button in (1, 2, 3):
+                self.handle_touch(event.pos)
+        elif event.type == pygame.MOUSEMOTION:
+            if self.notes_view.dragging:
+                self.notes_view.move(event.pos, self.time_source.time())
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if self.notes_view.dragging:
+                self.notes_view.release(self.time_source.time())
+        elif event.type == pygame.MOUSEWHEEL:
+            if self.current_screen == "notes":
+                self.notes_view.fling(-event.y * NOTE_SCROLL_WHEEL_SPEED, self.time_source.time())
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return False
+            elif event.key == pygame.K_F1:
+                self.toggle_render_mode()
+            elif event.key == pygame.K_F3:
+                self.toggle_profile_overlay()
+            elif event.key == pygame.K_F4:
+                self.dump_frame_trace()
+            elif event.key == pygame.K_F5:
+                self.dump_memory()
+            elif pygame.K_1 <= event.key <= pygame.K_9 and not self.virtual_keyboard_active:
+                # Number keys start and stop the custom timer presets, in config order
+                presets = list(self.timer_presets)
+                index = event.key - pygame.K_1
+                if index < len(presets):
+                    self.start_preset(presets[index])
+            elif event.key == pygame.K_SPACE and not IS_RASPBERRY_PI:
+                # Space bar acts as power button on desktop
+                self.simulated_gpio.press()
+            elif self.virtual_keyboard_active:
+                if event.key == pygame.K_RETURN:
+                    if self.searching:
+                        # Keep the query and its results on screen
+                        self.virtual_keyboard_active = False
+                    else:
+                        if self.note_input.strip():
+                            self.add_note(self.note_input.strip())
+                        self.virtual_keyboard_active = False
+                        self.note_input = ""
+                elif event.key == pygame.K_BACKSPACE:
+                    self.note_input = self.note_input[:-1]
+                else:
+                    if len(self.note_input) < 100:
+                        self.note_input += event.unicode
+        return True
+    
     def run(self):
         """Main application loop"""
         running = True
         
         try:
             while running:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
-                    elif event.type == pygame.MOUSEBUTTONDOWN:
-                        self.handle_touch(event.pos)
-                    elif event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            running = False
-                        elif event.key == pygame.K_SPACE and not IS_RASPBERRY_PI:
-                            # Space bar acts as power button on desktop
-                            self.handle_power_button()
-                        elif self.virtual_keyboard_active:
-                            if event.key == pygame.K_RETURN:
-                                if self.note_input.strip():
-                                    self.notes.append(self.note_input.strip())
-                                    self.save_notes()
-                                self.virtual_keyboard_active = False
-                                self.note_input = ""
-                            elif event.key == pygame.K_BACKSPACE:
-                                self.note_input = self.note_input[:-1]
-                            else:
-                                if len(self.note_input) < 100:
-                                    self.note_input += event.unicode
+                if self.profiler.enabled:
+                    running = self.run_profiled_frame()
+                    continue
                 
                 self.check_timer()
                 self.update_animation()
+                self.present(self.render_frame())
+                self.input_bridge.frame_presented()
                 
-                if self.current_screen == "main":
-                    self.draw_main_screen()
-                elif self.current_screen == "notes":
-                    self.draw_notes_screen()
-                
-                pygame.display.flip()
-                self.clock.tick(30)
+                for event in self.wait_for_events():
+                    if not self.handle_event(event):
+                        running = False
                 
         except KeyboardInterrupt:
             print("Shutting down...")
         finally:
             self.cleanup()
     
+    def run_profiled_frame(self):
+        """One iteration of the main loop with every phase timed, returns False to quit"""
+        perf_counter = time.perf_counter
+        cpu_start = time.process_time()
+        t0 = perf_counter()
+        self.check_timer()
+        t1 = perf_counter()
+        self.update_animation()
+        t2 = perf_counter()
+        dirty_rects = self.render_frame()
+        if self.profile_overlay:
+            overlay_rect = self.draw_profile_overlay()
+            if dirty_rects is not None:
+                dirty_rects.append(overlay_rect)
+        t3 = perf_counter()
+        self.present(dirty_rects)
+        self.input_bridge.frame_presented()
+        t4 = perf_counter()
+        events = self.wait_for_events()
+        t5 = perf_counter()
+        running = True
+        for event in events:
+            if not self.handle_event(event):
+                running = False
+        t6 = perf_counter()
+        self.profiler.record((t0, t1, t2, t3, t4, t5, t6), time.process_time() - cpu_start)
+        return running
+    
     def cleanup(self):
         """Clean up resources"""
-        if IS_RASPBERRY_PI:
+        if self.audio is not None:
+            self.audio.close()
+        if self.checkpoint is not None:
+            self.save_checkpoint()
+        self.writer.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.output is not None:
+            self.output.close()
+        if self._gpio_ready:
             GPIO.cleanup()
         pygame.quit()
         sys.exit()
 
+# Marks the end of module import for the startup timeline
+MODULE_READY_T = time.perf_counter()
+
 if __name__ == "__main__":
     print("Starting ORV Study Buddy...")
     app = ORVStudyBuddy()